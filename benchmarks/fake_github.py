@@ -0,0 +1,526 @@
+"""In-process fake GitHub REST API server for benchmarking `push-action`
+
+The server serves a single repository with a protected target branch and a temporary
+branch, whose head commit has `workflows * runs_per_workflow` workflow runs with
+`jobs_per_run` jobs each, and `statuses` third-party commit statuses.
+All jobs and statuses are required status checks of the target branch.
+Each workflow also has `history_runs` successful runs from the past, with the same jobs
+and durations.
+
+Jobs progress through their steps in (wall-clock) time, according to their simulated
+durations, from the moment the server is started.
+Responses can be delayed (`latency`), and a primary rate limit is enforced, which
+resets every `rate_limit_window` seconds.
+Conditional requests (`If-None-Match`) are answered with `304 Not Modified`, which is
+not counted against the rate limit, as for the real GitHub API.
+Endpoints can be made to fail transiently, responding `502 Bad Gateway` to their first
+`failures[endpoint]` requests.
+
+The status check rollup of the GraphQL API (`POST /api/graphql`) is served as well,
+in a single page.
+"""
+
+from collections import Counter
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+from threading import Lock, Thread
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qs, urlsplit
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, List, Optional, Tuple
+
+
+OWNER = "owner"
+REPOSITORY = "repo"
+TARGET_BRANCH = "main"
+TEMP_BRANCH = "push-action/1/benchmark"
+HEAD_SHA = "0123456789abcdef0123456789abcdef01234567"
+STEPS = 10
+
+
+class FakeGitHub:  # pylint: disable=too-many-instance-attributes
+    """Fake GitHub REST API for a single repository
+
+    Start the server with `start()`, the REST API base URL is then `url`.
+    Request metrics are collected in `calls` (per endpoint), `status_codes` and
+    `bytes_sent`.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        *,
+        workflows: int = 3,
+        runs_per_workflow: int = 1,
+        jobs_per_run: int = 4,
+        statuses: int = 0,
+        job_duration: float = 5.0,
+        duration_spread: float = 0.5,
+        latency: float = 0.0,
+        rate_limit: int = 5000,
+        rate_limit_window: float = 3600.0,
+        history_runs: int = 0,
+        failures: "Optional[Dict[str, int]]" = None,
+    ) -> None:
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+
+        self.runs: "List[Dict[str, Any]]" = []
+        self.jobs: "Dict[int, List[Tuple[str, float]]]" = {}
+        self.history: "Dict[int, List[int]]" = {}
+        for workflow in range(workflows):
+            for run in range(runs_per_workflow):
+                run_id = 1000 + workflow * runs_per_workflow + run
+                self.runs.append(
+                    {
+                        "id": run_id,
+                        "name": f"Workflow {workflow}",
+                        "workflow_id": 100 + workflow,
+                        "head_branch": TEMP_BRANCH,
+                        "head_sha": HEAD_SHA,
+                        "run_attempt": 1,
+                        "event": "push",
+                        "html_url": f"https://github.com/{OWNER}/{REPOSITORY}"
+                        f"/actions/runs/{run_id}",
+                    }
+                )
+                # Deterministic spread of the job durations
+                self.jobs[run_id] = [
+                    (
+                        f"Workflow {workflow} / run {run} / job {job}",
+                        job_duration
+                        * (1 + duration_spread * ((job * 7919 + run_id) % 100) / 100),
+                    )
+                    for job in range(jobs_per_run)
+                ]
+            self.history[100 + workflow] = [
+                900000 + workflow * history_runs + run for run in range(history_runs)
+            ]
+            for run_id in self.history[100 + workflow]:
+                self.jobs[run_id] = self.jobs[1000 + workflow * runs_per_workflow]
+        self.statuses = [
+            (f"ci/external-{status}", job_duration * (1 + duration_spread))
+            for status in range(statuses)
+        ]
+
+        self.required_statuses = [
+            name for jobs in self.jobs.values() for name, _ in jobs
+        ] + [name for name, _ in self.statuses]
+
+        self.calls: "Counter[str]" = Counter()
+        self.status_codes: "Counter[int]" = Counter()
+        self.bytes_sent = 0
+        self._lock = Lock()
+        self._used = 0
+        self._window_start = 0.0
+        self.started = 0.0
+        self._server: "Optional[ThreadingHTTPServer]" = None
+
+    @property
+    def url(self) -> str:
+        """The REST API base URL of the (started) server"""
+        if self._server is None:
+            raise RuntimeError("The fake GitHub server has not been started.")
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def last_completion(self) -> float:
+        """The (wall-clock) time the last required check completes"""
+        durations = [duration for jobs in self.jobs.values() for _, duration in jobs]
+        durations.extend(duration for _, duration in self.statuses)
+        return self.started + max(durations, default=0.0)
+
+    @property
+    def api_calls(self) -> int:
+        """Total number of requests received"""
+        return sum(self.calls.values())
+
+    def start(self) -> "FakeGitHub":
+        """Start serving in a background thread, starting the simulated jobs"""
+        fake = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            """Dispatch requests to the fake GitHub API"""
+
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """Handle GET requests"""
+                fake.handle(self, "GET")
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                """Handle POST requests"""
+                fake.handle(self, "POST")
+
+            def do_PATCH(self):  # pylint: disable=invalid-name
+                """Handle PATCH requests"""
+                fake.handle(self, "PATCH")
+
+            def do_DELETE(self):  # pylint: disable=invalid-name
+                """Handle DELETE requests"""
+                fake.handle(self, "DELETE")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        Thread(target=self._server.serve_forever, daemon=True).start()
+        self.started = self._window_start = time.time()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def handle(  # pylint: disable=too-many-locals
+        self, request: BaseHTTPRequestHandler, method: str
+    ) -> None:
+        """Handle a request"""
+        body = request.rfile.read(int(request.headers.get("Content-Length") or 0))
+        del body
+
+        split_url = urlsplit(request.path)
+        query = {key: value[-1] for key, value in parse_qs(split_url.query).items()}
+        endpoint, status_code, response, link = self.route(
+            method, split_url.path, query
+        )
+
+        data = json.dumps(response).encode() if response is not None else b""
+        etag = f'"{hashlib.sha1(data).hexdigest()}"'  # nosec B324
+        not_modified = (
+            status_code == 200 and request.headers.get("If-None-Match") == etag
+        )
+
+        with self._lock:
+            now = time.time()
+            if now - self._window_start >= self.rate_limit_window:
+                self._window_start, self._used = now, 0
+            if not not_modified and self._used >= self.rate_limit:
+                status_code = 403
+                data = json.dumps({"message": "API rate limit exceeded"}).encode()
+                link = None
+            elif not not_modified:
+                self._used += 1
+            remaining = max(self.rate_limit - self._used, 0)
+            reset = self._window_start + self.rate_limit_window
+
+            if not_modified:
+                status_code, data = 304, b""
+            elif status_code < 400 and self.failures.get(endpoint, 0) > 0:
+                self.failures[endpoint] -= 1
+                status_code = 502
+                data = json.dumps({"message": "Server Error"}).encode()
+                link = None
+            self.calls[f"{method} {endpoint}"] += 1
+            self.status_codes[status_code] += 1
+            self.bytes_sent += len(data)
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        request.send_response(status_code)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        request.send_header("ETag", etag)
+        request.send_header("X-RateLimit-Limit", str(self.rate_limit))
+        request.send_header("X-RateLimit-Remaining", str(remaining))
+        request.send_header("X-RateLimit-Used", str(self.rate_limit - remaining))
+        request.send_header("X-RateLimit-Reset", str(int(reset) + 1))
+        if link:
+            request.send_header("Link", link)
+        request.end_headers()
+        request.wfile.write(data)
+
+    def route(  # pylint: disable=too-many-return-statements
+        self, method: str, path: str, query: "Dict[str, str]"
+    ) -> "Tuple[str, int, Any, Optional[str]]":
+        """Return the endpoint name, status code, response and `Link` header"""
+        if method == "POST" and path in ("/graphql", "/api/graphql"):
+            return "graphql", 200, self.status_check_rollup(), None
+
+        prefix = f"/repos/{OWNER}/{REPOSITORY}"
+        if not path.startswith(prefix):
+            return "unknown", 404, {"message": "Not Found"}, None
+        path = path[len(prefix) :]
+
+        if method == "GET" and not path:
+            return (
+                "repository",
+                200,
+                {"name": REPOSITORY, "owner": {"login": OWNER}},
+                None,
+            )
+
+        match = re.fullmatch(
+            r"/branches/(?P<branch>.+?)"
+            r"(?P<reviews>/protection/required_pull_request_reviews)?",
+            path,
+        )
+        if match and match.group("reviews"):
+            if method == "GET":
+                return (
+                    "required_pull_request_reviews",
+                    200,
+                    {
+                        "dismiss_stale_reviews": True,
+                        "required_approving_review_count": 1,
+                    },
+                    None,
+                )
+            return (
+                "required_pull_request_reviews",
+                200 if method == "PATCH" else 204,
+                {} if method == "PATCH" else None,
+                None,
+            )
+        if match and method == "GET":
+            return "branch", 200, self.branch(match.group("branch")), None
+
+        if method == "DELETE" and path.startswith("/git/refs/heads/"):
+            return "ref", 204, None, None
+
+        if method == "GET" and path == "/actions/runs":
+            runs = [
+                run for run in self.runs if run["head_sha"] == query.get("head_sha")
+            ]
+            return ("runs", 200, *self.page(runs, "workflow_runs", path, query))
+
+        match = re.fullmatch(r"/actions/workflows/(?P<workflow_id>\d+)/runs", path)
+        if method == "GET" and match:
+            runs = [
+                {"id": run_id, "status": "completed", "conclusion": "success"}
+                for run_id in self.history.get(int(match.group("workflow_id")), [])
+            ]
+            return (
+                "workflow_runs",
+                200,
+                *self.page(runs, "workflow_runs", path, query),
+            )
+
+        match = re.fullmatch(r"/actions/runs/(?P<run_id>\d+)/jobs", path)
+        if method == "GET" and match:
+            run_id = int(match.group("run_id"))
+            return (
+                "jobs",
+                200,
+                *self.page(
+                    self.run_jobs(run_id, *self.page_range(query)),
+                    "jobs",
+                    path,
+                    query,
+                    total=len(self.jobs.get(run_id, [])),
+                ),
+            )
+
+        if method == "GET" and path == f"/commits/{HEAD_SHA}/check-runs":
+            return ("check_runs", 200, *self.page([], "check_runs", path, query))
+
+        if method == "GET" and path == f"/commits/{HEAD_SHA}/status":
+            status = self.combined_status()
+            page, link = self.page(status.pop("statuses"), "statuses", path, query)
+            return "status", 200, {**status, **page}, link
+
+        return "unknown", 404, {"message": "Not Found"}, None
+
+    def branch(self, name: str) -> "Dict[str, Any]":
+        """Return a branch"""
+        if name == TARGET_BRANCH:
+            return {
+                "name": name,
+                "commit": {"sha": "f" * 40},
+                "protected": True,
+                "protection": {
+                    "enabled": True,
+                    "required_status_checks": {
+                        "enforcement_level": "everyone",
+                        "contexts": self.required_statuses,
+                    },
+                },
+            }
+        return {"name": name, "commit": {"sha": HEAD_SHA}, "protected": False}
+
+    def run_jobs(
+        self, run_id: int, start: int = 0, stop: "Optional[int]" = None
+    ) -> "List[Dict[str, Any]]":
+        """Return the jobs `start:stop` of a workflow run in their current state"""
+        started = self.started
+        if any(run_id in runs for runs in self.history.values()):
+            started -= 3600.0
+        elapsed = time.time() - started
+        jobs = []
+        for number, (name, duration) in enumerate(
+            self.jobs.get(run_id, [])[start:stop], start=start
+        ):
+            completed_steps = min(int(STEPS * elapsed / duration), STEPS)
+            completed = completed_steps == STEPS
+            jobs.append(
+                {
+                    "id": run_id * 10000 + number,
+                    "run_id": run_id,
+                    "run_attempt": 1,
+                    "name": name,
+                    "head_sha": HEAD_SHA,
+                    "status": "completed" if completed else "in_progress",
+                    "conclusion": "success" if completed else None,
+                    "started_at": _timestamp(started),
+                    "completed_at": (
+                        _timestamp(started + duration) if completed else None
+                    ),
+                    "html_url": f"https://github.com/{OWNER}/{REPOSITORY}/actions"
+                    f"/runs/{run_id}/job/{run_id * 10000 + number}",
+                    "labels": ["ubuntu-latest"],
+                    "runner_name": "GitHub Actions 1",
+                    "steps": [
+                        {
+                            "name": f"Step {step}",
+                            "number": step + 1,
+                            "status": (
+                                "completed" if step < completed_steps else "queued"
+                            ),
+                            "conclusion": (
+                                "success" if step < completed_steps else None
+                            ),
+                        }
+                        for step in range(STEPS)
+                    ],
+                }
+            )
+        return jobs
+
+    def status_check_rollup(self) -> "Dict[str, Any]":
+        """Return the GraphQL response with the branch protection rule of the target
+        branch and the status check rollup of the head commit"""
+        contexts: "List[Dict[str, Any]]" = [
+            {
+                "__typename": "CheckRun",
+                "databaseId": job["id"],
+                "name": job["name"],
+                "status": job["status"].upper(),
+                "conclusion": (job["conclusion"] or "").upper() or None,
+                "startedAt": job["started_at"],
+                "completedAt": job["completed_at"],
+                "steps": {
+                    "nodes": [
+                        {"status": step["status"].upper()} for step in job["steps"]
+                    ]
+                },
+                "checkSuite": {
+                    "app": {"slug": "github-actions"},
+                    "workflowRun": {"databaseId": run["id"]},
+                },
+            }
+            for run in self.runs
+            for job in self.run_jobs(run["id"])
+        ]
+        contexts.extend(
+            {
+                "__typename": "StatusContext",
+                "context": status["context"],
+                "state": status["state"].upper(),
+                "createdAt": status["created_at"],
+            }
+            for status in self.combined_status()["statuses"]
+        )
+        return {
+            "data": {
+                "rateLimit": {"cost": 1, "remaining": self.rate_limit - self._used},
+                "repository": {
+                    "ref": {
+                        "branchProtectionRule": {
+                            "requiredStatusChecks": [
+                                {"context": name} for name in self.required_statuses
+                            ]
+                        }
+                    },
+                    "tempRef": {
+                        "target": {
+                            "oid": HEAD_SHA,
+                            "statusCheckRollup": {
+                                "contexts": {
+                                    "pageInfo": {
+                                        "hasNextPage": False,
+                                        "endCursor": None,
+                                    },
+                                    "nodes": contexts,
+                                }
+                            },
+                        }
+                    },
+                },
+            }
+        }
+
+    def combined_status(self) -> "Dict[str, Any]":
+        """Return the combined commit status of the head commit"""
+        elapsed = time.time() - self.started
+        statuses = [
+            {
+                "id": number + 1,
+                "context": name,
+                "state": "success" if elapsed >= duration else "pending",
+                "created_at": _timestamp(self.started),
+                "updated_at": _timestamp(self.started + min(elapsed, duration)),
+            }
+            for number, (name, duration) in enumerate(self.statuses)
+        ]
+        return {
+            "state": (
+                "success"
+                if all(status["state"] == "success" for status in statuses)
+                else "pending"
+            ),
+            "sha": HEAD_SHA,
+            "total_count": len(statuses),
+            "statuses": statuses,
+        }
+
+    @staticmethod
+    def page_range(query: "Dict[str, str]") -> "Tuple[int, int]":
+        """Return the start and stop index of the requested page of items"""
+        per_page = int(query.get("per_page", 30))
+        page = int(query.get("page", 1))
+        return (page - 1) * per_page, page * per_page
+
+    def page(  # pylint: disable=too-many-arguments
+        self,
+        items: "List[Any]",
+        key: str,
+        path: str,
+        query: "Dict[str, str]",
+        total: "Optional[int]" = None,
+    ) -> "Tuple[Dict[str, Any], Optional[str]]":
+        """Return a page of items and its `Link` header (if there are more pages)
+
+        If `total` is given, `items` are only the items of the requested page.
+        """
+        start, stop = self.page_range(query)
+        if total is None:
+            total, items = len(items), items[start:stop]
+        link = None
+        if stop < total:
+            next_query = "&".join(
+                f"{name}={value}"
+                for name, value in {
+                    **query,
+                    "page": int(query.get("page", 1)) + 1,
+                }.items()
+            )
+            link = (
+                f"<{self.url}/repos/{OWNER}/{REPOSITORY}{path}?{next_query}>; "
+                'rel="next"'
+            )
+        return {"total_count": total, key: items}, link
+
+
+def _timestamp(posix: float) -> str:
+    """Format a POSIX timestamp as the GitHub API does"""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(posix))
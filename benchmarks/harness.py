@@ -0,0 +1,212 @@
+"""Benchmark harness running `push-action` end to end against a fake GitHub API
+
+Every scenario configures a `FakeGitHub` server (see `fake_github.py`), and runs the
+`push-action` subcommands in the order `entrypoint.sh` does, in-process, against it.
+
+Metrics per scenario:
+
+- `api_calls`: Number of GitHub API requests (also per endpoint and status code).
+- `bytes_transferred`: Total size of the response bodies.
+- `wait_seconds`: Wall-clock duration of `wait_for_checks`.
+- `detection_latency_seconds`: Time from the last required check completing until
+  `wait_for_checks` returns.
+- `peak_memory_bytes`: Peak traced Python memory (including the fake server).
+
+Each scenario is run in a fresh Python process, so the in-memory state of
+`push_action` does not carry over between scenarios.
+Run a single scenario with `python benchmarks/harness.py SCENARIO`, which prints its
+metrics as JSON, or all scenarios with `invoke benchmark-api`.
+"""
+
+from contextlib import redirect_stdout
+import io
+import json
+import os
+from pathlib import Path
+import subprocess  # nosec B404
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import TYPE_CHECKING
+
+from fake_github import OWNER, REPOSITORY, TARGET_BRANCH, TEMP_BRANCH, FakeGitHub
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, List
+
+
+SCENARIOS: "Dict[str, Dict[str, Any]]" = {
+    "small": {
+        "server": {"workflows": 3, "jobs_per_run": 4, "job_duration": 3.0},
+    },
+    "matrix": {
+        "server": {
+            "workflows": 2,
+            "jobs_per_run": 256,
+            "job_duration": 4.0,
+            "latency": 0.01,
+        },
+    },
+    "many_runs": {
+        "server": {
+            "workflows": 10,
+            "runs_per_workflow": 3,
+            "jobs_per_run": 3,
+            "statuses": 5,
+            "job_duration": 4.0,
+            "latency": 0.02,
+        },
+    },
+    "rate_limited": {
+        "server": {
+            "workflows": 4,
+            "jobs_per_run": 4,
+            "job_duration": 4.0,
+            "rate_limit": 10,
+            "rate_limit_window": 3.0,
+        },
+    },
+    "predicted": {
+        "server": {
+            "workflows": 3,
+            "jobs_per_run": 4,
+            "job_duration": 10.0,
+            "duration_spread": 0.2,
+            "history_runs": 3,
+        },
+        "args": ["--predict-runs", "3"],
+    },
+    "graphql_transient": {
+        "server": {
+            "workflows": 3,
+            "jobs_per_run": 4,
+            "job_duration": 3.0,
+            "failures": {"graphql": 1},
+        },
+        "env": {"INPUT_GH_API_BACKEND": "graphql"},
+    },
+}
+"""Benchmark scenarios, with the settings of the fake GitHub server, and (optionally)
+extra arguments for `wait_for_checks` and environment variables (inputs)."""
+
+WAIT_ARGS = [
+    "--wait-timeout",
+    "5",
+    "--wait-interval",
+    "2",
+    "--min-wait-interval",
+    "1",
+    "--max-wait-interval",
+    "5",
+    "--ready-timeout",
+    "5",
+    "--acceptable-conclusion",
+    "success",
+]
+"""Arguments for `wait_for_checks`, with short intervals to keep the benchmarks
+short."""
+
+
+def run_scenario(name: str) -> "Dict[str, Any]":
+    """Run a scenario in the current process, returning its metrics"""
+    scenario = SCENARIOS[name]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fake = FakeGitHub(**scenario["server"])
+        os.environ.update(
+            {
+                "GITHUB_REPOSITORY": f"{OWNER}/{REPOSITORY}",
+                "GITHUB_RUN_ID": "1",
+                "INPUT_CACHE_DIR": tmpdir,
+                **scenario.get("env", {}),
+            }
+        )
+        os.environ.pop("PUSH_ACTION_SOCKET", None)
+        os.chdir(tmpdir)
+
+        # pylint: disable=import-outside-toplevel
+        from push_action.run import run
+
+        tracemalloc.start()
+        fake.start()
+        os.environ["INPUT_GH_REST_API_BASE_URL"] = fake.url
+
+        commands: "Dict[str, float]" = {}
+        wait_returned = 0.0
+        try:
+            for command, ref, extra_args in [
+                ("protected_branch", TARGET_BRANCH, []),
+                (
+                    "wait_for_checks",
+                    TARGET_BRANCH,
+                    WAIT_ARGS + scenario.get("args", []),
+                ),
+                ("unprotect_reviews", TARGET_BRANCH, []),
+                ("protect_reviews", TARGET_BRANCH, []),
+                ("remove_temp_branch", TARGET_BRANCH, []),
+            ]:
+                start = time.monotonic()
+                with redirect_stdout(io.StringIO()):
+                    fail = run(
+                        [
+                            "--token",
+                            "benchmark",
+                            "--ref",
+                            ref,
+                            "--temp-branch",
+                            TEMP_BRANCH,
+                            *extra_args,
+                            "--",
+                            command,
+                        ]
+                    )
+                commands[command] = time.monotonic() - start
+                if command == "wait_for_checks":
+                    wait_returned = time.time()
+                if fail:
+                    raise RuntimeError(f"{command} failed: {fail}")
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            fake.stop()
+
+    return {
+        "api_calls": fake.api_calls,
+        "bytes_transferred": fake.bytes_sent,
+        "wait_seconds": round(commands["wait_for_checks"], 3),
+        "detection_latency_seconds": round(wait_returned - fake.last_completion, 3),
+        "peak_memory_bytes": peak_memory,
+        "commands_seconds": {
+            command: round(duration, 3) for command, duration in commands.items()
+        },
+        "calls": dict(sorted(fake.calls.items())),
+        "status_codes": {
+            str(code): count for code, count in sorted(fake.status_codes.items())
+        },
+    }
+
+
+def run_scenarios(names: "List[str]") -> "Dict[str, Dict[str, Any]]":
+    """Run scenarios, each in a fresh Python process, returning their metrics"""
+    top_dir = Path(__file__).parent.parent.resolve()
+    results = {}
+    for name in names:
+        result = subprocess.run(  # nosec B603
+            [sys.executable, str(Path(__file__).resolve()), name],
+            capture_output=True,
+            check=False,
+            env={**os.environ, "PYTHONPATH": str(top_dir)},
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Benchmark scenario {name!r} failed:\n{result.stderr}")
+        results[name] = json.loads(result.stdout)
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in SCENARIOS:
+        sys.exit(f"Usage: {sys.argv[0]} {{{','.join(SCENARIOS)}}}")
+    sys.path.insert(0, str(Path(__file__).parent.parent.resolve()))
+    print(json.dumps(run_scenario(sys.argv[1])))
@@ -12,12 +12,18 @@ esac
 set -e
 
 if [ -n "${INPUT_SLEEP}" ]; then
-    echo "::warning title=Deprecated input::The 'sleep' input is deprecated. Please use 'pre_sleep' instead."
-    if [ -z "${INPUT_PRE_SLEEP}" ] || [ "${INPUT_PRE_SLEEP}" == "5" ]; then
-        # If `pre_sleep` is not defined, or is the default value, use the deprecated `sleep` input value
+    echo "::warning title=Deprecated input::The 'sleep' input is deprecated. Please use 'ready_timeout' instead."
+    if [ -z "${INPUT_PRE_SLEEP}" ]; then
+        # If `pre_sleep` is not defined, use the deprecated `sleep` input value
         INPUT_PRE_SLEEP=${INPUT_SLEEP}
     fi
 fi
+if [ -n "${INPUT_PRE_SLEEP}" ] && [ "${INPUT_PRE_SLEEP}" != "${INPUT_SLEEP}" ]; then
+    echo "::warning title=Deprecated input::The 'pre_sleep' input is deprecated. Please use 'ready_timeout' instead."
+fi
+if [ -n "${INPUT_POST_SLEEP}" ]; then
+    echo "::warning title=Deprecated input::The 'post_sleep' input is deprecated and not needed anymore, since the action waits for all required status checks to start and complete."
+fi
 
 # Utility functions
 ere_quote() {
@@ -29,7 +35,7 @@ unprotect () {
             if [ -n "${PUSH_PROTECTED_CHANGED_BRANCH}" ] && [ -n "${PUSH_PROTECTED_PROTECTED_BRANCH}" ]; then
                 echo -e "\nRemove '${INPUT_BRANCH}' pull request review protection ..."
 
-                push-action \
+                push-action ${PROFILE} \
                     --token "${INPUT_TOKEN}" \
                     --ref "${INPUT_BRANCH}" \
                     --temp-branch "${PUSH_PROTECTED_TEMPORARY_BRANCH}" \
@@ -51,7 +57,7 @@ protect () {
             if [ -n "${PUSH_PROTECTED_CHANGED_BRANCH}" ] && [ -n "${PUSH_PROTECTED_PROTECTED_BRANCH}" ]; then
                 echo -e "\nRe-add '${INPUT_BRANCH}' pull request review protection ..."
 
-                push-action \
+                push-action ${PROFILE} \
                     --token "${INPUT_TOKEN}" \
                     --ref "${INPUT_BRANCH}" \
                     --temp-branch "${PUSH_PROTECTED_TEMPORARY_BRANCH}" \
@@ -71,8 +77,11 @@ wait_for_checks() {
     if [ -n "${PUSH_PROTECTED_CHANGED_BRANCH}" ] && [ -n "${PUSH_PROTECTED_PROTECTED_BRANCH}" ]; then
         echo -e "\nWaiting for status checks to finish for '${PUSH_PROTECTED_TEMPORARY_BRANCH}' ..."
 
-        # Sleep to let the workflows/status checks start up
-        sleep ${INPUT_PRE_SLEEP}
+        # The deprecated fixed sleep is only used if explicitly requested,
+        # `push-action` otherwise waits until the status checks have started up
+        if [ -n "${INPUT_PRE_SLEEP}" ]; then
+            sleep ${INPUT_PRE_SLEEP}
+        fi
 
         ACCEPTABLE_CONCLUSIONS=()
         while IFS="," read -ra CONCLUSIONS; do
@@ -81,26 +90,38 @@ wait_for_checks() {
             done
         done <<< "${INPUT_ACCEPTABLE_CONCLUSIONS}"
 
-        push-action ${FAIL_FAST} \
+        push-action ${FAIL_FAST} ${CANCEL_RUNS} ${PROFILE} \
             --token "${INPUT_TOKEN}" \
             --ref "${INPUT_BRANCH}" \
             --temp-branch "${PUSH_PROTECTED_TEMPORARY_BRANCH}" \
             --wait-timeout "${INPUT_TIMEOUT}" \
-            --wait-interval "${INPUT_INTERVAL}"\
+            --wait-interval "${INPUT_INTERVAL}" \
+            --min-wait-interval "${INPUT_MIN_INTERVAL}" \
+            --max-wait-interval "${INPUT_MAX_INTERVAL}" \
+            --concurrency "${INPUT_CONCURRENCY}" \
+            --wait-mode "${INPUT_WAIT_MODE}" \
+            --webhook-port "${INPUT_WEBHOOK_PORT}" \
+            --event-timeout "${INPUT_EVENT_TIMEOUT}" \
+            --ready-timeout "${INPUT_READY_TIMEOUT}" \
+            --record-trace "${INPUT_RECORD_TRACE}" \
+            --duration-history "${INPUT_DURATION_HISTORY}" \
+            --predict-runs "${INPUT_PREDICT_RUNS}" \
             "${ACCEPTABLE_CONCLUSIONS[@]}" \
             -- wait_for_checks
 
         echo "Waiting for status checks to finish for '${PUSH_PROTECTED_TEMPORARY_BRANCH}' ... DONE!"
     fi
 
-    # Sleep to add addtional time buffer for status checks
-    sleep ${INPUT_POST_SLEEP}
+    # Deprecated fixed sleep after waiting (only if explicitly requested)
+    if [ -n "${INPUT_POST_SLEEP}" ]; then
+        sleep ${INPUT_POST_SLEEP}
+    fi
 }
 remove_remote_temp_branch() {
     if [ -n "${PUSH_PROTECTED_CHANGED_BRANCH}" ] && [ -n "${PUSH_PROTECTED_PROTECTED_BRANCH}" ]; then
         echo -e "\nRemoving temporary branch '${PUSH_PROTECTED_TEMPORARY_BRANCH}' ..."
 
-        push-action \
+        push-action ${PROFILE} \
             --token "${INPUT_TOKEN}" \
             --ref "${INPUT_BRANCH}" \
             --temp-branch "${PUSH_PROTECTED_TEMPORARY_BRANCH}" \
@@ -121,6 +142,31 @@ push_to_target() {
     git reset --hard ${PUSH_PROTECTED_TEMPORARY_BRANCH}
     git push ${PUSH_PROTECTED_FORCE_PUSH}
 }
+start_server() {
+    # Serve all push-action calls of this run from a single long-lived process
+    export PUSH_ACTION_SOCKET="${RUNNER_TEMP:-/tmp}/push-action-${GITHUB_RUN_ID}-$$.sock"
+
+    push-action --token "null" --ref "null" --temp-branch "null" -- serve &
+    PUSH_PROTECTED_SERVER_PID=$!
+
+    # Wait for the server to listen (push-action calls run in-process until then)
+    for _ in $(seq 50); do
+        [ -S "${PUSH_ACTION_SOCKET}" ] && break
+        sleep 0.1
+    done
+}
+stop_server() {
+    if [ -n "${PUSH_PROTECTED_SERVER_PID}" ]; then
+        kill ${PUSH_PROTECTED_SERVER_PID} 2>/dev/null || :
+        wait ${PUSH_PROTECTED_SERVER_PID} 2>/dev/null || :
+        unset PUSH_ACTION_SOCKET
+    fi
+}
+report_metrics() {
+    # Summarize the GitHub API usage and timings of all push-action calls
+    push-action --token "null" --ref "null" --temp-branch "null" -- report_metrics || :
+    rm -f "${PUSH_ACTION_METRICS_FILE}"
+}
 cleanup() {
     # Get exit code of latest command
     EXIT_CODE=$?
@@ -128,17 +174,29 @@ cleanup() {
     # Cleanup - Remove temporary branch
     remove_remote_temp_branch
 
+    # Report metrics of this run
+    report_metrics
+
+    # Stop the push-action server
+    stop_server
+
     exit ${EXIT_CODE}
 }
 
 # Trap exit command and cleanup
 trap cleanup EXIT
 
+# Collect metrics of all push-action calls (also in the server)
+export PUSH_ACTION_METRICS_FILE="${RUNNER_TEMP:-/tmp}/push-action-metrics-${GITHUB_RUN_ID}-$$.jsonl"
+
 # Enter chosen working directory
 if [ -n "${INPUT_PATH}" ]; then
     cd ${INPUT_PATH}
 fi
 
+# Start the push-action server (in the working directory of the push-action calls)
+start_server
+
 # Determine branch
 if [ -n "${INPUT_REF}" ]; then
     if [ -n "${INPUT_BRANCH}" ]; then
@@ -190,9 +248,22 @@ if [ "$(git rev-parse HEAD)" != "$(git rev-parse origin/${INPUT_BRANCH})" ]; the
     PUSH_PROTECTED_CHANGED_BRANCH=yes
 fi
 
+# --profile
+case ${INPUT_PROFILE} in
+    y | Y | yes | Yes | YES | true | True | TRUE | on | On | ON)
+        echo -e "\nWill profile push-action calls!"
+        PROFILE="--profile"
+        ;;
+    n | N | no | No | NO | false | False | FALSE | off | Off | OFF)
+        ;;
+    *)
+        echo -e "\nNon-valid input for 'profile': ${INPUT_PROFILE}. Will use default (false)."
+        ;;
+esac
+
 # Check whether target branch is protected
 # This will only be non-empty if the branch IS protected
-PUSH_PROTECTED_PROTECTED_BRANCH=$(push-action --token "${INPUT_TOKEN}" --ref "${INPUT_BRANCH}" --temp-branch "null" -- protected_branch)
+PUSH_PROTECTED_PROTECTED_BRANCH=$(push-action ${PROFILE} --token "${INPUT_TOKEN}" --ref "${INPUT_BRANCH}" --temp-branch "null" -- protected_branch)
 
 # Create new temporary branch
 PUSH_PROTECTED_TEMPORARY_BRANCH="push-action/${GITHUB_RUN_ID}/${RANDOM}-${RANDOM}-${RANDOM}"
@@ -242,6 +313,19 @@ case ${INPUT_FAIL_FAST} in
         ;;
 esac
 
+# --cancel-runs
+case ${INPUT_CANCEL_RUNS} in
+    y | Y | yes | Yes | YES | true | True | TRUE | on | On | ON)
+        echo -e "\nWill cancel the remaining workflow runs for the temporary branch as soon as any check fails!"
+        CANCEL_RUNS="--cancel-runs"
+        ;;
+    n | N | no | No | NO | false | False | FALSE | off | Off | OFF)
+        ;;
+    *)
+        echo -e "\nNon-valid input for 'cancel_runs': ${INPUT_CANCEL_RUNS}. Will use default (false)."
+        ;;
+esac
+
 # Possibly wait for status checks to complete
 wait_for_checks
 
@@ -1,59 +1,425 @@
 """push_action.cache
 
-A simple implementation of an in-memory cache.
-It's a glorified dictionary and is mainly here as a representation of playing around
-with and learning dunder methods.
+An in-memory TTL/LRU cache with namespaces, and a `memoize` decorator using it.
+
+Furthermore, an HTTP revalidation cache for conditional GitHub API requests, and a
+file-backed cache, which is shared between the `push-action` invocations of a single
+action run.
 """
 
-from typing import TYPE_CHECKING
+from collections import OrderedDict
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+from pathlib import Path
+import sys
+import tempfile
+from threading import Lock, RLock
+from time import monotonic, time
+from typing import TYPE_CHECKING, ParamSpec, TypeVar
 
 if TYPE_CHECKING:  # pragma: no cover
-    from typing import Any
-    from collections.abc import Iterator
+    from typing import Any, Dict, Optional, Tuple
+    from collections.abc import Callable, Hashable, Iterable, Mapping
+
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+LOGGER = logging.getLogger("push_action.cache")
+
+
+class MemoryCache:
+    """In-memory TTL/LRU cache with namespaces
+
+    Entries are stored per namespace and key, and expire after the TTL of their
+    namespace (if any).
+    When the number of entries exceeds `max_entries`, or their (estimated) total size
+    exceeds `max_bytes`, the least recently used entries are evicted.
+    The cache is thread-safe.
+    """
+
+    def __init__(
+        self, max_entries: int = 1024, max_bytes: "Optional[int]" = None
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, int, Any]]" = (
+            OrderedDict()
+        )
+        self._ttls: "Dict[str, Optional[float]]" = {}
+        self._size = 0
+        self._lock = RLock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def __len__(self) -> int:
+        """Number of cached entries (including expired, not yet removed, entries)"""
+        return len(self._entries)
+
+    def __contains__(self, item: "Tuple[str, Hashable]") -> bool:
+        """Whether a non-expired entry is cached for `(namespace, key)`"""
+        with self._lock:
+            entry = self._entries.get(item)
+            return entry is not None and entry[0] > monotonic()
+
+    @property
+    def size(self) -> int:
+        """Estimated total size (in bytes) of the cached values
+
+        Only tracked if `max_bytes` is set.
+        """
+        return self._size
+
+    def configure(self, namespace: str, ttl: "Optional[float]" = None) -> None:
+        """Set the TTL (in seconds) for the entries of namespace (`None`: no expiry)"""
+        self._ttls[namespace] = ttl
+
+    def get(self, namespace: str, key: "Hashable", fallback: "Any" = None) -> "Any":
+        """Get cached value for key in namespace, if it exists and has not expired"""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                self.stats["misses"] += 1
+                return fallback
+
+            if entry[0] <= monotonic():
+                self._remove((namespace, key))
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return fallback
+
+            self._entries.move_to_end((namespace, key))
+            self.stats["hits"] += 1
+            return entry[2]
+
+    def set(
+        self,
+        namespace: str,
+        key: "Hashable",
+        value: "Any",
+        ttl: "Optional[float]" = None,
+    ) -> None:
+        """Set cached value for key in namespace
+
+        `ttl` defaults to the TTL of the namespace (see `configure()`).
+        """
+        if ttl is None:
+            ttl = self._ttls.get(namespace)
+        expires = float("inf") if ttl is None else monotonic() + ttl
+        size = _sizeof(value) if self.max_bytes is not None else 0
+
+        with self._lock:
+            self._remove((namespace, key))
+            self._entries[(namespace, key)] = (expires, size, value)
+            self._size += size
+            self._evict()
+
+    def delete(self, namespace: str, key: "Hashable") -> None:
+        """Delete cached value for key in namespace (if it exists)"""
+        with self._lock:
+            self._remove((namespace, key))
+
+    def clear(self, namespace: "Optional[str]" = None) -> None:
+        """Delete all cached values (of namespace)"""
+        with self._lock:
+            for item in list(self._entries):
+                if namespace is None or item[0] == namespace:
+                    self._remove(item)
+
+    def _remove(self, item: "Tuple[str, Hashable]") -> None:
+        """Remove an entry (if it exists), the lock must be held"""
+        entry = self._entries.pop(item, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+    def _evict(self) -> None:
+        """Evict least recently used entries until within bounds, the lock must be
+        held"""
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._size > self.max_bytes)
+        ):
+            item, (_, size, _) = self._entries.popitem(last=False)
+            self._size -= size
+            self.stats["evictions"] += 1
+            LOGGER.debug("Evicted in-memory cache entry %s", item)
+
+
+def _sizeof(value: "Any") -> int:
+    """Estimate the size (in bytes) of a (JSON-like) value"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(key) + _sizeof(item) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(_sizeof(item) for item in value)
+    return size
+
+
+def memoize(
+    namespace: str,
+    ttl: "Optional[float]" = None,
+    ignore: "Iterable[str]" = ("new_request", "max_workers"),
+) -> "Callable[[Callable[P, R]], Callable[P, R]]":
+    """Memoize a function in the in-memory cache (`MEMORY_CACHE`)
+
+    The results are stored in namespace, keyed on the arguments of the function,
+    except the parameters in `ignore`, which do not change the requested data.
+    Calling the function with `new_request=True` bypasses the cached result, and
+    caches the new one.
+    """
+
+    def decorator(func: "Callable[P, R]") -> "Callable[P, R]":
+        signature = inspect.signature(func)
+        MEMORY_CACHE.configure(namespace, ttl)
+
+        @functools.wraps(func)
+        def wrapper(*args: "P.args", **kwargs: "P.kwargs") -> "R":
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(
+                (name, _hashable(value))
+                for name, value in bound.arguments.items()
+                if name not in ignore
+            )
+
+            if not bound.arguments.get("new_request", False):
+                cached = MEMORY_CACHE.get(namespace, key, _MISSING)
+                if cached is not _MISSING:
+                    return cached
+
+            result = func(*args, **kwargs)
+            MEMORY_CACHE.set(namespace, key, result)
+            return result
+
+        return wrapper
 
+    return decorator
 
-class InMemoryCache:
-    """In-memory key-value cache"""
+
+def _hashable(value: "Any") -> "Hashable":
+    """Return a hashable representation of an argument value"""
+    if isinstance(value, dict):
+        return tuple(
+            sorted(((key, _hashable(item)) for key, item in value.items()), key=repr)
+        )
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, set):
+        return tuple(sorted((_hashable(item) for item in value), key=repr))
+    return value
+
+
+_MISSING = object()
+
+
+CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+"""Request headers with the validators of a cached response."""
+
+
+class RevalidationCache:
+    """HTTP revalidation cache
+
+    Stores the validators (`ETag` and `Last-Modified` headers), the pagination links
+    and the parsed body of responses per request key.
+    The validators are sent back as `If-None-Match` and `If-Modified-Since` on the
+    next request for the same key, and the cached body is served if the server
+    responds with `304 Not Modified`.
+    At most `max_entries` responses are kept, evicting the least recently used first.
+    """
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._entries: (
+            "OrderedDict[str, Tuple[Dict[str, str], Any, Dict[str, str]]]"
+        ) = OrderedDict()
+        self._lock = Lock()
+        self.stats = {"conditional": 0, "not_modified": 0, "modified": 0}
 
     def __len__(self):
-        """Number of cached keys"""
-        return len(self.__dict__)
-
-    def __getitem__(self, key: str) -> "Any":
-        """Get cached value, example: `self[key]`"""
-        if not isinstance(key, str):
-            raise TypeError("Supplied key must be a string.")
-        if key not in self.__dict__:
-            raise KeyError(f"{key!r} not found in cache.")
-        return self.__dict__[key]
-
-    def __setitem__(self, key: str, value: "Any") -> None:
-        """Set cached value, example: `self[key] = value`"""
-        if not isinstance(key, str):
-            raise TypeError("Supplied key must be a string.")
-        self.__dict__[key] = value
-
-    def __delitem__(self, key: str) -> None:
-        """Delete cached value, example: `del self[key]`"""
-        if not isinstance(key, str):
-            raise TypeError("Supplied key must be a string.")
-        if key not in self.__dict__:
-            raise KeyError(f"{key!r} not found in cache.")
-        del self.__dict__[key]
-
-    def __iter__(self) -> "Iterator":
-        """Iterate over the cached keys"""
-        return iter(self.__dict__.keys())
-
-    def __contains__(self, item: str) -> bool:
-        """Whether item is cached or not"""
-        if not isinstance(item, str):
-            raise TypeError("Item must be a string.")
-        return item in self.__dict__
+        """Number of cached responses"""
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        """Whether a response is cached for key or not"""
+        return key in self._entries
+
+    def conditional_headers(self, key: str) -> "Dict[str, str]":
+        """Return conditional request headers for key (empty if nothing is cached)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return {}
+            self._entries.move_to_end(key)
+            self.stats["conditional"] += 1
+            return dict(entry[0])
+
+    def store(
+        self,
+        key: str,
+        headers: "Mapping[str, str]",
+        body: "Any",
+        links: "Optional[Dict[str, str]]" = None,
+    ) -> None:
+        """Store body and pagination links (`{rel: url}`) for key
+
+        Nothing is stored if the response headers contain no validators.
+        """
+        validators = {}
+        if headers.get("ETag"):
+            validators["If-None-Match"] = headers["ETag"]
+        if headers.get("Last-Modified"):
+            validators["If-Modified-Since"] = headers["Last-Modified"]
+
+        with self._lock:
+            if key in self._entries:
+                self.stats["modified"] += 1
+            if validators:
+                self._entries[key] = (validators, body, dict(links or {}))
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    evicted, _ = self._entries.popitem(last=False)
+                    LOGGER.debug("Evicted revalidation cache entry %s", evicted)
+            else:
+                self._entries.pop(key, None)
+
+    def revalidated(self, key: str) -> "Tuple[Any, Dict[str, str]]":
+        """Return the cached body and pagination links for key after a
+        `304 Not Modified` response
+
+        Raises `KeyError` if nothing is cached for key (anymore).
+        """
+        with self._lock:
+            entry = self._entries[key]
+            self.stats["not_modified"] += 1
+            LOGGER.debug("Revalidated cached response for %s", key)
+            return entry[1], dict(entry[2])
+
+
+class FileCache:
+    """File-backed key-value cache with TTLs
+
+    Every `push-action` invocation is a new process, so the in-memory cache does not
+    survive between them.
+    This cache stores JSON-serializable values as files in a directory scoped to the
+    current GitHub Actions run (`GITHUB_RUN_ID` and `GITHUB_RUN_ATTEMPT`).
+
+    The directory is taken from the `cache_dir` input (`INPUT_CACHE_DIR`), falling back
+    to `RUNNER_TEMP` and lastly the system's temporary directory.
+    Files are written atomically and the total size of the cache is bounded by
+    `max_bytes`, evicting expired and then least recently written entries first.
+
+    The cache is best-effort: Any file system error is logged and treated as a miss.
+    """
+
+    def __init__(
+        self, directory: "Optional[Path]" = None, max_bytes: int = 5 * 1024**2
+    ) -> None:
+        self._directory = directory
+        self.max_bytes = max_bytes
+
+    @property
+    def directory(self) -> Path:
+        """The directory for the cache files of the current action run"""
+        if self._directory is None:
+            base = (
+                os.getenv("INPUT_CACHE_DIR")
+                or os.getenv("RUNNER_TEMP")
+                or tempfile.gettempdir()
+            )
+            run = (
+                f"{os.getenv('GITHUB_RUN_ID', 'local')}-"
+                f"{os.getenv('GITHUB_RUN_ATTEMPT', '1')}"
+            )
+            self._directory = Path(base) / "push-action-cache" / run
+        return self._directory
+
+    def _path(self, key: str) -> Path:
+        """Path to the cache file for key"""
+        return self.directory / f"{hashlib.sha256(key.encode()).hexdigest()}.json"
 
     def get(self, key: str, fallback: "Any" = None) -> "Any":
-        """Get cached value from key"""
-        return self.__dict__.get(key, fallback)
+        """Get cached value from key, if it exists and has not expired"""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf8"))
+        except FileNotFoundError:
+            return fallback
+        except (OSError, ValueError) as exc:
+            LOGGER.debug("Could not read file cache entry %s: %r", path, exc)
+            return fallback
+
+        if entry.get("key") != key or entry.get("expires", 0) < time():
+            return fallback
+
+        LOGGER.debug("File cache hit for %r", key)
+        return entry.get("value", fallback)
+
+    def set(self, key: str, value: "Any", ttl: float) -> None:
+        """Set cached value for key, expiring after `ttl` seconds"""
+        path = self._path(key)
+        data = json.dumps({"key": key, "expires": time() + ttl, "value": value})
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handle, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(handle, "w", encoding="utf8") as tmp_file:
+                    tmp_file.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as exc:
+            LOGGER.debug("Could not write file cache entry %s: %r", path, exc)
+            return
+
+        self._evict()
+
+    def delete(self, key: str) -> None:
+        """Delete cached value for key (if it exists)"""
+        try:
+            self._path(key).unlink(missing_ok=True)
+        except OSError as exc:
+            LOGGER.debug("Could not delete file cache entry for %r: %r", key, exc)
+
+    def _evict(self) -> None:
+        """Evict entries until the total size is below `max_bytes`"""
+        entries = []
+        total_size = 0
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+        if total_size <= self.max_bytes:
+            return
+
+        # Sort expired entries first, then the least recently written
+        def _expired(path: Path) -> bool:
+            try:
+                return json.loads(path.read_text(encoding="utf8"))["expires"] < time()
+            except (OSError, ValueError, KeyError):
+                return True
+
+        entries.sort(key=lambda entry: (not _expired(entry[2]), entry[0]))
+        for _, size, path in entries:
+            if total_size <= self.max_bytes:
+                break
+            try:
+                path.unlink(missing_ok=True)
+            except OSError:
+                continue
+            total_size -= size
+            LOGGER.debug("Evicted file cache entry %s", path)
 
 
-IN_MEMORY_CACHE = InMemoryCache()
+MEMORY_CACHE: "MemoryCache" = MemoryCache()
+FILE_CACHE = FileCache()
+REVALIDATION_CACHE = RevalidationCache()
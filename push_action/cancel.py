@@ -0,0 +1,115 @@
+"""push_action.cancel
+
+Cancellation of the workflow runs for the temporary branch (`--cancel-runs`).
+
+Once a required status check has completed unsuccessfully, the outcome of the
+`wait_for_checks` action is known, and the other workflow runs for the temporary branch
+would only keep using runner minutes until the branch is removed (and, for runs that
+have already started, even after that).
+All runs for the head commit of the temporary branch that have not yet completed are
+therefore cancelled, concurrently.
+
+The runner minutes saved are estimated from the jobs of every cancelled run that had not
+yet completed (see `push_action.scheduler.estimate_completion()`).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+from time import time
+from typing import TYPE_CHECKING
+
+from push_action.config import CONFIG, DEFAULT_CONCURRENCY
+from push_action.predictor import PREDICTOR
+from push_action.scheduler import estimate_completion
+from push_action.utils import (
+    cancel_workflow_run,
+    get_branch_head_sha,
+    get_head_sha_workflow_runs,
+    iter_workflow_run_jobs,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Optional, Tuple
+
+
+LOGGER = logging.getLogger("push_action.cancel")
+
+
+def cancel_runs(max_workers: int = DEFAULT_CONCURRENCY) -> None:
+    """Cancel the workflow runs for the temporary branch that have not yet completed
+
+    The current workflow run (`GITHUB_RUN_ID`) is never cancelled.
+    Failures are reported, but not raised, since the action has already failed.
+    """
+    try:
+        runs = [
+            run["id"]
+            for run in get_head_sha_workflow_runs(
+                get_branch_head_sha(CONFIG.args.temp_branch),
+                CONFIG.args.temp_branch,
+                new_request=True,
+            )
+            if run.get("status") != "completed"
+            and str(run["id"]) != os.getenv("GITHUB_RUN_ID", "")
+        ]
+    except RuntimeError as exc:
+        print(f"Could not list the workflow runs to cancel: {exc}", flush=True)
+        return
+
+    if not runs:
+        print("No workflow runs for the temporary branch left to cancel.", flush=True)
+        return
+
+    print(
+        f"Cancelling {len(runs)} workflow runs for the temporary branch ...",
+        flush=True,
+    )
+    with ThreadPoolExecutor(
+        max_workers=max(min(max_workers, len(runs)), 1)
+    ) as executor:
+        results = list(executor.map(_cancel_run, runs))
+
+    cancelled = [result for result in results if result is not None]
+    saved_seconds = sum(seconds for seconds, _ in cancelled)
+    unestimated = sum(jobs for _, jobs in cancelled)
+    print(
+        f"Cancelled {len(cancelled)} of {len(runs)} workflow runs for the temporary "
+        f"branch, saving an estimated {saved_seconds / 60:.1f} runner minutes"
+        + (
+            f" ({unestimated} unfinished jobs without an estimate not included)."
+            if unestimated
+            else "."
+        ),
+        flush=True,
+    )
+
+
+def _cancel_run(run_id: int) -> "Optional[Tuple[float, int]]":
+    """Cancel a workflow run
+
+    Returns the estimated runner time (in seconds) the jobs of the run that had not
+    yet completed would have taken, and the number of these jobs without an estimate,
+    or `None` if the run could not be cancelled.
+    """
+    try:
+        jobs = [job for job in iter_workflow_run_jobs(run_id) if not job.completed]
+    except RuntimeError as exc:
+        LOGGER.debug("Could not retrieve the jobs of run %s: %r", run_id, exc)
+        jobs = []
+
+    try:
+        cancel_workflow_run(run_id)
+    except RuntimeError as exc:
+        # E.g., 409 Conflict, if the run completed in the meantime
+        print(f"Could not cancel workflow run {run_id}: {exc}", flush=True)
+        return None
+
+    now = time()
+    estimates = [
+        estimate_completion(job, now, PREDICTOR if PREDICTOR else None) for job in jobs
+    ]
+    return (
+        sum(estimate for estimate in estimates if estimate is not None),
+        sum(1 for estimate in estimates if estimate is None),
+    )
@@ -0,0 +1,47 @@
+"""push_action.config
+
+Default settings for the `push-action` CLI.
+
+This module is imported on every CLI start, hence it must stay free of (slow) imports.
+"""
+
+from argparse import Namespace
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any, Dict, List, Optional
+
+DEFAULT_CONCURRENCY = 8
+"""Default maximum number of concurrent GitHub API requests."""
+
+DEFAULT_PER_PAGE = 100
+"""Default page size for paginated GitHub API requests (the maximum allowed is 100)."""
+
+DEFAULT_POOL_SIZE = 10
+"""Default maximum number of HTTP connections kept alive per host."""
+
+DEFAULT_READY_TIMEOUT = 60
+"""Default grace period (in seconds) for the required status checks to start."""
+
+
+class Config:  # pylint: disable=too-few-public-methods
+    """Run-time configuration of the current `push-action` command
+
+    Set by `push_action.run.run()` for every command.
+    """
+
+    def __init__(self) -> None:
+        self.args = Namespace()
+        """Parsed command-line arguments."""
+
+        self.acceptable_conclusions: "List[str]" = []
+        """Acceptable job conclusions for the `wait_for_checks` action."""
+
+        self.serving = False
+        """Whether commands are run by a long-lived server (see `push_action.server`)."""
+
+        self.protection_rules: "Optional[Dict[str, Any]]" = None
+        """Pull request review protection rules removed by `unprotect_reviews`."""
+
+
+CONFIG = Config()
@@ -0,0 +1,215 @@
+"""push_action.events
+
+Event sources for the event-driven mode of the `wait_for_checks` action.
+
+Instead of polling the GitHub API, the statuses of the required checks can be
+consumed from `workflow_job`, `check_run` and `status` webhook events.
+The events are normalized into job-like dictionaries with the keys `name`, `status`,
+`conclusion`, `run_id`, `run_attempt` and `head_sha`.
+
+Event sources:
+
+- `WebhookListener`: A small local HTTP server receiving (signed) webhook deliveries.
+- `QueueEventSource`: An in-process queue, e.g., for other integrations or testing.
+
+`post_event()` is a local stand-in event producer, delivering a signed event to a
+`WebhookListener`, similar to how GitHub would.
+"""
+
+from abc import ABC, abstractmethod
+import hashlib
+import hmac
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+from queue import Empty, Queue
+from threading import Thread
+from typing import TYPE_CHECKING
+from urllib.request import Request, urlopen
+
+from push_action.jobs import STATUS_STATE_CONCLUSIONS
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any, Dict, Optional
+
+
+LOGGER = logging.getLogger("push_action.events")
+
+
+SUPPORTED_EVENTS = ("workflow_job", "check_run", "status")
+"""Supported GitHub webhook event types."""
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    """Return the `X-Hub-Signature-256` header value for body"""
+    digest = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def verify_signature(secret: str, body: bytes, signature: "Optional[str]") -> bool:
+    """Verify the `X-Hub-Signature-256` header of a webhook delivery"""
+    if not signature:
+        return False
+    return hmac.compare_digest(sign_payload(secret, body), signature)
+
+
+def parse_event(event: str, payload: "Dict[str, Any]") -> "Optional[Dict[str, Any]]":
+    """Normalize a webhook payload into a job-like dictionary
+
+    Returns `None` for unsupported events.
+    """
+    if event == "workflow_job" and "workflow_job" in payload:
+        job = payload["workflow_job"]
+        return {
+            "name": job.get("name", ""),
+            "status": job.get("status", ""),
+            "conclusion": job.get("conclusion"),
+            "run_id": job.get("run_id"),
+            "run_attempt": job.get("run_attempt", 1),
+            "head_sha": job.get("head_sha", ""),
+        }
+
+    if event == "check_run" and "check_run" in payload:
+        check_run = payload["check_run"]
+        return {
+            "name": check_run.get("name", ""),
+            "status": check_run.get("status", ""),
+            "conclusion": check_run.get("conclusion"),
+            "run_id": None,
+            "run_attempt": 1,
+            "head_sha": check_run.get("head_sha", ""),
+        }
+
+    if event == "status" and "context" in payload:
+        state = payload.get("state", "pending")
+        return {
+            "name": payload["context"],
+            "status": "in_progress" if state == "pending" else "completed",
+            "conclusion": STATUS_STATE_CONCLUSIONS.get(state),
+            "run_id": None,
+            "run_attempt": 1,
+            "head_sha": payload.get("sha", ""),
+        }
+
+    return None
+
+
+class EventSource(ABC):
+    """Base class for a source of normalized status events"""
+
+    @abstractmethod
+    def get(self, timeout: float) -> "Optional[Dict[str, Any]]":
+        """Return the next event, or `None` if none arrived within timeout seconds"""
+
+    def close(self) -> None:
+        """Release any resources held by the event source"""
+
+
+class QueueEventSource(EventSource):
+    """In-process event source, events are added with `put()`"""
+
+    def __init__(self) -> None:
+        self._queue: "Queue[Dict[str, Any]]" = Queue()
+
+    def put(self, event: str, payload: "Dict[str, Any]") -> None:
+        """Add a webhook event payload (unsupported events are ignored)"""
+        parsed = parse_event(event, payload)
+        if parsed is not None:
+            self._queue.put(parsed)
+
+    def get(self, timeout: float) -> "Optional[Dict[str, Any]]":
+        try:
+            return self._queue.get(timeout=max(timeout, 0))
+        except Empty:
+            return None
+
+
+class WebhookListener(QueueEventSource):
+    """Local HTTP listener for GitHub webhook deliveries
+
+    Deliveries must be signed with the shared secret (`X-Hub-Signature-256` header),
+    otherwise they are rejected.
+    """
+
+    def __init__(
+        self, secret: str, host: str = "0.0.0.0", port: int = 8080  # nosec B104
+    ) -> None:
+        super().__init__()
+
+        if not secret:
+            raise ValueError("A webhook secret is required to verify webhook events.")
+
+        listener = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            """Handle webhook deliveries"""
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                LOGGER.debug("Webhook listener: " + format, *args)
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                """Receive a webhook delivery"""
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+                if not verify_signature(
+                    secret, body, self.headers.get("X-Hub-Signature-256")
+                ):
+                    LOGGER.debug("Rejected webhook delivery with invalid signature")
+                    self.send_response(401)
+                    self.end_headers()
+                    return
+
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    self.send_response(400)
+                    self.end_headers()
+                    return
+
+                listener.put(self.headers.get("X-GitHub-Event", ""), payload)
+                self.send_response(202)
+                self.end_headers()
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        LOGGER.debug("Webhook listener started on %s:%s", host, self.port)
+
+    @property
+    def port(self) -> int:
+        """The port the listener is bound to"""
+        return self._server.server_address[1]
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+def post_event(
+    url: str, event: str, payload: "Dict[str, Any]", secret: str, timeout: float = 10
+) -> int:
+    """Deliver a signed webhook event to a `WebhookListener`
+
+    This is a local stand-in for GitHub's webhook deliveries.
+    Returns the HTTP status code of the response.
+    """
+    body = json.dumps(payload).encode()
+    request = Request(
+        url,
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            "X-GitHub-Event": event,
+            "X-Hub-Signature-256": sign_payload(secret, body),
+        },
+        method="POST",
+    )
+    try:
+        with urlopen(request, timeout=timeout) as response:  # nosec B310
+            return response.status
+    except OSError as exc:
+        status = getattr(exc, "code", None)
+        if status is None:
+            raise
+        return status
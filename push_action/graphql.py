@@ -0,0 +1,274 @@
+"""push_action.graphql
+
+GraphQL backend for the `wait_for_checks` action.
+
+A single GraphQL query returns the branch protection rule of the target branch and
+the status check rollup of the temporary branch's head commit, i.e., all check runs
+(including their check suites) and commit status contexts.
+This replaces the several REST requests otherwise needed for the startup phase and
+for each poll.
+
+The backend is selected with the `gh_api_backend` input.
+"""
+
+import logging
+import os
+from typing import TYPE_CHECKING
+
+from push_action.cache import memoize
+from push_action.config import CONFIG
+from push_action.jobs import STATUS_STATE_CONCLUSIONS, Job, parse_timestamp
+from push_action.utils import (
+    COMMIT_CHECKS,
+    GITHUB_ACTIONS_APP,
+    api_request,
+    get_api_v3_base,
+)
+from push_action.validate import GITHUB_ENTERPRISE_API_PREFIX
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any, Dict, List, Optional
+
+
+LOGGER = logging.getLogger("push_action.graphql")
+
+
+STATUS_CHECKS_QUERY = """
+query($owner: String!, $name: String!, $ref: String!, $tempRef: String!,
+      $cursor: String) {
+  rateLimit {
+    cost
+    remaining
+  }
+  repository(owner: $owner, name: $name) {
+    ref(qualifiedName: $ref) {
+      branchProtectionRule {
+        requiredStatusChecks {
+          context
+        }
+      }
+    }
+    tempRef: ref(qualifiedName: $tempRef) {
+      target {
+        ... on Commit {
+          oid
+          statusCheckRollup {
+            contexts(first: 100, after: $cursor) {
+              pageInfo {
+                hasNextPage
+                endCursor
+              }
+              nodes {
+                __typename
+                ... on CheckRun {
+                  databaseId
+                  name
+                  status
+                  conclusion
+                  startedAt
+                  completedAt
+                  steps(first: 100) {
+                    nodes {
+                      status
+                    }
+                  }
+                  checkSuite {
+                    app {
+                      slug
+                    }
+                    workflowRun {
+                      databaseId
+                    }
+                  }
+                }
+                ... on StatusContext {
+                  context
+                  state
+                  createdAt
+                }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+"""Query for the branch protection rule of `ref` and the status checks of the head
+commit of `tempRef`."""
+
+QUERY_STATS = {"queries": 0, "cost": 0}
+"""Number of GraphQL queries sent, and their total rate limit cost (in points)."""
+
+
+def graphql_url(api_base_url: str) -> str:
+    """Return the GraphQL API endpoint for a (validated) REST API base URL
+
+    GitHub Enterprise Server serves the GraphQL API under `/api/graphql` instead of
+    `/api/v3`.
+    """
+    if api_base_url.endswith(GITHUB_ENTERPRISE_API_PREFIX):
+        return api_base_url[: -len(GITHUB_ENTERPRISE_API_PREFIX)] + "/api/graphql"
+    return f"{api_base_url}/graphql"
+
+
+def graphql_request(query: str, variables: "Dict[str, Any]") -> "Dict[str, Any]":
+    """Perform GitHub GraphQL API request, returning the `data` of the response
+
+    The rate limit cost of the query (`rateLimit { cost }`) is added to `QUERY_STATS`.
+    Queries are read-only, hence transient failures are retried (as `"graphql"`, see
+    `push_action.retry`).
+    """
+    response = api_request(
+        graphql_url(get_api_v3_base()),
+        http_request="post",
+        retry_as="graphql",
+        json={"query": query, "variables": variables},
+    )
+
+    if not isinstance(response, dict):
+        raise TypeError(
+            f"Expected response to be a dict, instead it was of type {type(response)}"
+        )
+
+    if response.get("errors"):
+        raise RuntimeError(f"GraphQL query failed:\n{response['errors']}")
+
+    data = response.get("data") or {}
+
+    QUERY_STATS["queries"] += 1
+    QUERY_STATS["cost"] += (data.get("rateLimit") or {}).get("cost", 0)
+
+    return data
+
+
+def _parse_context(node: "Dict[str, Any]") -> "Optional[Job]":
+    """Parse a status check rollup context into a `Job`"""
+    if node.get("__typename") == "CheckRun":
+        check_suite = node.get("checkSuite") or {}
+        app = (check_suite.get("app") or {}).get("slug", "")
+
+        # Only GitHub Actions check runs belong to a workflow run
+        run_id = COMMIT_CHECKS
+        if app == GITHUB_ACTIONS_APP:
+            run_id = (check_suite.get("workflowRun") or {}).get(
+                "databaseId"
+            ) or COMMIT_CHECKS
+
+        steps = (node.get("steps") or {}).get("nodes") or []
+        return Job(
+            id=node.get("databaseId") or 0,
+            name=node.get("name", ""),
+            run_id=run_id,
+            status=(node.get("status") or "").lower(),
+            conclusion=(node.get("conclusion") or "").lower() or None,
+            started_at=parse_timestamp(node.get("startedAt")),
+            completed_at=parse_timestamp(node.get("completedAt")),
+            steps_total=len(steps),
+            steps_completed=sum(
+                1 for step in steps if (step or {}).get("status") == "COMPLETED"
+            ),
+            app=app,
+        )
+
+    if node.get("__typename") == "StatusContext":
+        state = (node.get("state") or "pending").lower()
+        completed = state in STATUS_STATE_CONCLUSIONS
+        return Job(
+            name=node.get("context", ""),
+            run_id=COMMIT_CHECKS,
+            status="completed" if completed else "in_progress",
+            conclusion=STATUS_STATE_CONCLUSIONS.get(state),
+            started_at=parse_timestamp(node.get("createdAt")),
+        )
+
+    return None
+
+
+@memoize("get_status_checks")
+def get_status_checks(
+    ref: str,
+    temp_branch: str,
+    new_request: bool = False,  # pylint: disable=unused-argument
+) -> "Dict[str, Any]":
+    """Return the protection of `ref` and the status checks of `temp_branch`
+
+    The returned dictionary has the keys:
+
+    - `protected`: Whether `ref` has a branch protection rule.
+    - `required_statuses`: The required status check contexts of `ref`.
+    - `head_sha`: The SHA of the head commit of `temp_branch` (empty if not found).
+    - `checks`: The latest check run per name and all commit statuses of the head
+      commit as `Job`s (see `push_action.utils.get_commit_checks()`).
+      GitHub Actions check runs have the `run_id` of their workflow run.
+
+    Usually this is a single query, more are only needed for more than 100 checks.
+    """
+    variables: "Dict[str, Any]" = {
+        "owner": os.getenv("GITHUB_REPOSITORY", "").partition("/")[0],
+        "name": os.getenv("GITHUB_REPOSITORY", "").partition("/")[2],
+        "ref": f"refs/heads/{ref}",
+        "tempRef": f"refs/heads/{temp_branch}",
+        "cursor": None,
+    }
+
+    status_checks: "Dict[str, Any]" = {
+        "protected": False,
+        "required_statuses": [],
+        "head_sha": "",
+        "checks": [],
+    }
+    checks: "Dict[str, Job]" = {}
+    while True:
+        repository = (
+            graphql_request(STATUS_CHECKS_QUERY, variables).get("repository") or {}
+        )
+
+        rule = (repository.get("ref") or {}).get("branchProtectionRule")
+        status_checks["protected"] = rule is not None
+        status_checks["required_statuses"] = [
+            check["context"] for check in (rule or {}).get("requiredStatusChecks") or []
+        ]
+
+        commit = (repository.get("tempRef") or {}).get("target") or {}
+        status_checks["head_sha"] = commit.get("oid", "")
+
+        contexts = (commit.get("statusCheckRollup") or {}).get("contexts") or {}
+        for node in contexts.get("nodes") or []:
+            check = _parse_context(node or {})
+            if check is None or (
+                check.name in checks and checks[check.name].id > check.id
+            ):
+                continue
+            checks[check.name] = check
+
+        page_info = contexts.get("pageInfo") or {}
+        if not page_info.get("hasNextPage"):
+            break
+        variables["cursor"] = page_info.get("endCursor")
+
+    status_checks["checks"] = list(checks.values())
+    LOGGER.debug("Status checks from GraphQL: %s", status_checks)
+
+    return status_checks
+
+
+def get_required_status_checks(
+    required_statuses: "List[str]", new_request: bool = False
+) -> "List[Job]":
+    """Return the required GitHub Actions jobs and third-party checks
+
+    Third-party checks, i.e., not created by the GitHub Actions app, have the `run_id`
+    `COMMIT_CHECKS`.
+    """
+    required = set(required_statuses)
+    return [
+        check
+        for check in get_status_checks(
+            CONFIG.args.ref,
+            CONFIG.args.temp_branch,
+            new_request=new_request,
+        )["checks"]
+        if check.name in required
+    ]
@@ -0,0 +1,265 @@
+"""push_action.jobs
+
+Compact records of the jobs and status checks tracked by the `wait_for_checks` action.
+
+The GitHub API returns a lot of data for every job (steps, runner labels, URLs, ...),
+of which only a handful of fields are needed for waiting on the job.
+Payloads are therefore parsed into `Job` records as soon as they are received, and the
+raw payloads are dropped.
+
+The `StatusTracker` keeps the latest state of every required status check.
+"""
+
+from datetime import datetime
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import AbstractSet, Any, Dict, List, Optional, Set, Tuple
+    from collections.abc import Callable, Iterable
+
+
+LOGGER = logging.getLogger("push_action.jobs")
+
+
+STATUS_STATE_CONCLUSIONS = {
+    "success": "success",
+    "failure": "failure",
+    "error": "failure",
+}
+"""Map of (lowercase) commit status states to (check run) conclusions.
+The "pending" (and for GraphQL status contexts "expected") state means the status has
+not yet completed.
+"""
+
+
+def parse_timestamp(timestamp: "Optional[str]") -> "Optional[float]":
+    """Parse an ISO 8601 timestamp from the GitHub API into a POSIX timestamp"""
+    if not timestamp:
+        return None
+    try:
+        return datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        LOGGER.debug("Could not parse timestamp %r", timestamp)
+        return None
+
+
+class Job:  # pylint: disable=too-many-instance-attributes
+    """A GitHub Actions job, check run or commit status
+
+    Third-party check runs and commit statuses have the `run_id` `COMMIT_CHECKS`
+    (see `push_action.utils`).
+    Only the number of (completed) steps is kept, which is used to estimate the
+    remaining time of the job (see `push_action.scheduler`).
+    Timestamps are POSIX timestamps.
+
+    Records are shared, e.g., by the in-memory and revalidation caches, hence they
+    are never modified in place, but replaced (see `updated()`).
+    """
+
+    __slots__ = (
+        "id",
+        "name",
+        "run_id",
+        "run_attempt",
+        "status",
+        "conclusion",
+        "started_at",
+        "completed_at",
+        "steps_total",
+        "steps_completed",
+        "app",
+    )
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        name: str,
+        run_id: int,
+        *,
+        id: int = 0,  # pylint: disable=redefined-builtin
+        run_attempt: int = 1,
+        status: str = "",
+        conclusion: "Optional[str]" = None,
+        started_at: "Optional[float]" = None,
+        completed_at: "Optional[float]" = None,
+        steps_total: int = 0,
+        steps_completed: int = 0,
+        app: str = "",
+    ) -> None:
+        self.id = id  # pylint: disable=invalid-name
+        self.name = name
+        self.run_id = run_id
+        self.run_attempt = run_attempt
+        self.status = status
+        self.conclusion = conclusion
+        self.started_at = started_at
+        self.completed_at = completed_at
+        self.steps_total = steps_total
+        self.steps_completed = steps_completed
+        self.app = app
+
+    @classmethod
+    def from_workflow_job(cls, payload: "Dict[str, Any]") -> "Job":
+        """Parse a GitHub Actions workflow job from the REST API"""
+        steps: "List[Dict[str, Any]]" = payload.get("steps") or []
+        return cls(
+            id=payload.get("id", 0),
+            name=payload.get("name", ""),
+            run_id=payload.get("run_id", 0),
+            run_attempt=payload.get("run_attempt") or 1,
+            status=payload.get("status", ""),
+            conclusion=payload.get("conclusion"),
+            started_at=parse_timestamp(payload.get("started_at")),
+            completed_at=parse_timestamp(payload.get("completed_at")),
+            steps_total=len(steps),
+            steps_completed=sum(
+                1 for step in steps if step.get("status") == "completed"
+            ),
+        )
+
+    @property
+    def completed(self) -> bool:
+        """Whether the job has completed"""
+        return self.status == "completed"
+
+    def updated(self, event: "Dict[str, Any]") -> "Job":
+        """Return a copy of the job, updated from a status event (see
+        `push_action.events`)
+
+        Only the status, conclusion and run attempt are taken from the event.
+        """
+        job = Job(**self.as_dict())
+        for field in ("status", "conclusion", "run_attempt"):
+            if event.get(field) is not None:
+                setattr(job, field, event[field])
+        return job
+
+    def as_dict(self) -> "Dict[str, Any]":
+        """Return the job as a dictionary"""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self) -> str:
+        return (
+            f"Job(name={self.name!r}, run_id={self.run_id!r}, "
+            f"run_attempt={self.run_attempt!r}, status={self.status!r}, "
+            f"conclusion={self.conclusion!r})"
+        )
+
+
+class StatusTracker:
+    """Track the latest state of the required status checks
+
+    Jobs, check runs and status events are fed to the tracker as they are polled or
+    received, and each update is O(1):
+    The tracker keeps an index of the latest job per required status (name), and the
+    set of statuses that have not yet completed.
+    For re-run jobs, only the latest run attempt (and the newest job in an attempt) is
+    kept, so a job is never counted twice.
+
+    `on_update` is called with every job, whose state has been updated (e.g., to record
+    a trace, see `push_action.trace`).
+    """
+
+    def __init__(
+        self,
+        required_statuses: "Iterable[str]",
+        on_update: "Optional[Callable[[Job], None]]" = None,
+    ) -> None:
+        self.required_statuses = frozenset(required_statuses)
+        self.on_update = on_update
+        self._jobs: "Dict[str, Job]" = {}
+        self._pending: "Set[str]" = set()
+
+    def __len__(self) -> int:
+        """Number of tracked statuses"""
+        return len(self._jobs)
+
+    @property
+    def pending(self) -> "AbstractSet[str]":
+        """The statuses that have not yet completed"""
+        return self._pending
+
+    @property
+    def jobs(self) -> "List[Job]":
+        """The latest job of every tracked status"""
+        return list(self._jobs.values())
+
+    def pending_runs(self) -> "Dict[int, List[Job]]":
+        """Return the jobs that have not yet completed, grouped by workflow run"""
+        runs: "Dict[int, List[Job]]" = {}
+        for name in self._pending:
+            job = self._jobs[name]
+            runs.setdefault(job.run_id, []).append(job)
+        return runs
+
+    def update(self, job: "Job") -> "Optional[Job]":
+        """Update the state of a status from a (polled) job
+
+        Jobs of statuses that are not required, and jobs of older run attempts than the
+        tracked job, are ignored.
+        Returns the job if it has just completed, otherwise `None`.
+        """
+        if job.name not in self.required_statuses:
+            return None
+
+        current = self._jobs.get(job.name)
+        if current is not None and _attempt(current) > _attempt(job):
+            return None
+
+        self._jobs[job.name] = job
+        if self.on_update is not None:
+            self.on_update(job)
+        return self._transition(
+            job, _attempt(current) if current and current.completed else None
+        )
+
+    def update_event(self, event: "Dict[str, Any]") -> "Optional[Job]":
+        """Update the state of a tracked status from a status event
+
+        See `push_action.events` for the format of the events.
+        Events for untracked statuses, or for older run attempts than the tracked job,
+        are ignored.
+        Returns the updated job if it has just completed, otherwise `None`.
+        """
+        job = self._jobs.get(event.get("name", ""))
+        if job is None or (event.get("run_attempt") or 1) < job.run_attempt:
+            return None
+
+        completed = _attempt(job) if job.completed else None
+        job = self._jobs[job.name] = job.updated(event)
+        if self.on_update is not None:
+            self.on_update(job)
+        return self._transition(job, completed)
+
+    def _transition(
+        self, job: "Job", completed: "Optional[Tuple[int, int]]"
+    ) -> "Optional[Job]":
+        """Update the pending statuses for an updated job
+
+        `completed` is the run attempt and ID of the job the status had previously
+        completed with (if any).
+        Returns the job if it has just completed, otherwise `None`.
+        """
+        if not job.completed:
+            self._pending.add(job.name)
+            return None
+
+        self._pending.discard(job.name)
+        if completed == _attempt(job):
+            # The same job had already completed, e.g., when re-polling a run
+            return None
+        return job
+
+    def unsuccessful(self, acceptable_conclusions: "Iterable[str]") -> "List[Job]":
+        """Return the completed jobs with a conclusion not in acceptable_conclusions"""
+        acceptable = set(acceptable_conclusions)
+        return [
+            job
+            for job in self._jobs.values()
+            if job.completed and job.conclusion not in acceptable
+        ]
+
+
+def _attempt(job: "Job") -> "Tuple[int, int]":
+    """Return the run attempt and ID of a job, ordering re-runs of the same status"""
+    return job.run_attempt, job.id
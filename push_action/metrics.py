@@ -0,0 +1,310 @@
+"""push_action.metrics
+
+Instrumentation of `push-action` commands.
+
+Every GitHub API request is recorded per endpoint (count, response size, time and
+status codes), and the phases of a command (discovery, poll cycles, sleeping, ...) are
+timed with spans.
+
+When the `PUSH_ACTION_METRICS_FILE` environment variable is set, the metrics of every
+command are appended to it as a line of JSON.
+The `report_metrics` command then aggregates the metrics of all commands of an action
+run into a Markdown table for the job summary (`GITHUB_STEP_SUMMARY`) and action
+outputs (`GITHUB_OUTPUT`).
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+import json
+import logging
+import os
+import re
+from threading import Lock
+from time import monotonic
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from push_action.ratelimit import RATE_LIMITER
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any, Dict, List, Optional
+    from collections.abc import Iterator
+
+
+LOGGER = logging.getLogger("push_action.metrics")
+
+
+METRICS_FILE_ENV = "PUSH_ACTION_METRICS_FILE"
+"""Environment variable with the path to the file the command metrics are appended
+to."""
+
+ENDPOINT_PATTERNS = [
+    (re.compile(r"^.*?/repos/[^/]+/[^/]+"), "/repos/{owner}/{repo}"),
+    (re.compile(r"/branches/.+?(?=/protection|$)"), "/branches/{branch}"),
+    (re.compile(r"/git/refs/heads/.+$"), "/git/refs/heads/{branch}"),
+    (re.compile(r"/commits/[^/]+"), "/commits/{ref}"),
+    (re.compile(r"/\d+(?=/|$)"), "/{id}"),
+]
+"""Substitutions turning a request URL path into an endpoint name."""
+
+
+def endpoint(method: str, url: str) -> str:
+    """Return the endpoint name of a request, e.g.,
+    `GET /repos/{owner}/{repo}/actions/runs/{id}/jobs`"""
+    path = urlsplit(url).path
+    for pattern, replacement in ENDPOINT_PATTERNS:
+        path = pattern.sub(replacement, path)
+    return f"{method.upper()} {path}"
+
+
+class Metrics:
+    """Metrics of a single `push-action` command"""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self, command: str = "") -> None:
+        """Start recording the metrics of a new command"""
+        # pylint: disable=attribute-defined-outside-init
+        with self._lock:
+            self.command = command
+            self.started = monotonic()
+            self.requests: "Dict[str, Dict[str, Any]]" = {}
+            self.spans: "Dict[str, Dict[str, Any]]" = {}
+
+    @property
+    def api_calls(self) -> int:
+        """Number of GitHub API requests of the command so far"""
+        with self._lock:
+            return sum(request["requests"] for request in self.requests.values())
+
+    @contextmanager
+    def span(self, name: str) -> "Iterator[None]":
+        """Time a phase of the command
+
+        Spans with the same name are aggregated (count, total and maximum duration).
+        """
+        start = monotonic()
+        try:
+            yield
+        finally:
+            duration = monotonic() - start
+            with self._lock:
+                span = self.spans.setdefault(
+                    name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0}
+                )
+                span["count"] += 1
+                span["seconds"] += duration
+                span["max_seconds"] = max(span["max_seconds"], duration)
+
+    def record_request(
+        self,
+        method: str,
+        url: str,
+        status_code: "Optional[int]",
+        size: int,
+        seconds: float,
+    ) -> None:
+        """Record a GitHub API request
+
+        Failed requests (e.g., connection errors) are recorded without a status code.
+        """
+        name = endpoint(method, url)
+        with self._lock:
+            request = self.requests.setdefault(
+                name,
+                {"requests": 0, "bytes": 0, "seconds": 0.0, "status_codes": Counter()},
+            )
+            request["requests"] += 1
+            request["bytes"] += size
+            request["seconds"] += seconds
+            request["status_codes"][str(status_code or "error")] += 1
+
+    def summary(self, fail: str = "") -> "Dict[str, Any]":
+        """Return the metrics of the command as a JSON-serializable dictionary"""
+        with self._lock:
+            endpoints = {
+                name: {
+                    **request,
+                    "seconds": round(request["seconds"], 3),
+                    "status_codes": dict(request["status_codes"]),
+                }
+                for name, request in sorted(self.requests.items())
+            }
+            phases = {
+                name: {
+                    "count": span["count"],
+                    "seconds": round(span["seconds"], 3),
+                    "max_seconds": round(span["max_seconds"], 3),
+                }
+                for name, span in self.spans.items()
+            }
+
+        status_codes: "Counter[str]" = Counter()
+        for request in endpoints.values():
+            status_codes.update(request["status_codes"])
+
+        return {
+            "command": self.command,
+            "success": not fail,
+            "seconds": round(monotonic() - self.started, 3),
+            "phases": phases,
+            "api": {
+                "requests": sum(request["requests"] for request in endpoints.values()),
+                "bytes": sum(request["bytes"] for request in endpoints.values()),
+                "seconds": round(
+                    sum(request["seconds"] for request in endpoints.values()), 3
+                ),
+                "status_codes": dict(status_codes),
+                "endpoints": endpoints,
+            },
+            "rate_limit": {
+                "limit": RATE_LIMITER.limit,
+                "remaining": RATE_LIMITER.remaining,
+                **{
+                    key: round(value, 3)
+                    for key, value in self._rate_limit_usage().items()
+                },
+            },
+        }
+
+    @staticmethod
+    def _rate_limit_usage() -> "Dict[str, float]":
+        """Return the rate limit usage of the command
+
+        The statistics of the rate limiter are reset for every command (see
+        `push_action.run._configured_api()`).
+        """
+        return {
+            "used": RATE_LIMITER.stats["charged"],
+            "rate_limited": RATE_LIMITER.stats["rate_limited"],
+            "throttled_seconds": RATE_LIMITER.throttled_seconds,
+        }
+
+    def write(self, fail: str = "") -> None:
+        """Append the metrics of the command to the metrics file (if any)"""
+        path = os.getenv(METRICS_FILE_ENV, "")
+        if not path:
+            return
+        try:
+            with open(path, "a", encoding="utf8") as handle:
+                handle.write(json.dumps(self.summary(fail)) + "\n")
+        except OSError as exc:
+            LOGGER.debug("Could not write metrics to %s: %r", path, exc)
+
+
+METRICS = Metrics()
+
+
+def read_metrics(path: str) -> "List[Dict[str, Any]]":
+    """Read the metrics of all commands from a metrics file"""
+    try:
+        with open(path, encoding="utf8") as handle:
+            return [json.loads(line) for line in handle if line.strip()]
+    except (OSError, ValueError) as exc:
+        LOGGER.debug("Could not read metrics from %s: %r", path, exc)
+        return []
+
+
+def aggregate(commands: "List[Dict[str, Any]]") -> "Dict[str, Any]":
+    """Aggregate the metrics of the commands of an action run
+
+    The remaining rate limit is taken from the last command that used the GitHub API.
+    """
+    endpoints: "Dict[str, Dict[str, Any]]" = {}
+    rate_limit: "Dict[str, Any]" = {
+        "limit": None,
+        "remaining": None,
+        "used": 0,
+        "rate_limited": 0,
+        "throttled_seconds": 0.0,
+    }
+    for command in commands:
+        for name, request in command["api"]["endpoints"].items():
+            total = endpoints.setdefault(
+                name,
+                {"requests": 0, "bytes": 0, "seconds": 0.0, "status_codes": Counter()},
+            )
+            total["requests"] += request["requests"]
+            total["bytes"] += request["bytes"]
+            total["seconds"] = round(total["seconds"] + request["seconds"], 3)
+            total["status_codes"].update(request["status_codes"])
+        for key in ("used", "rate_limited", "throttled_seconds"):
+            rate_limit[key] = round(rate_limit[key] + command["rate_limit"][key], 3)
+        if command["api"]["requests"]:
+            rate_limit["limit"] = command["rate_limit"]["limit"]
+            rate_limit["remaining"] = command["rate_limit"]["remaining"]
+
+    return {
+        "api_calls": sum(command["api"]["requests"] for command in commands),
+        "api_bytes": sum(command["api"]["bytes"] for command in commands),
+        "wait_seconds": round(
+            sum(
+                command["seconds"]
+                for command in commands
+                if command["command"] == "wait_for_checks"
+            ),
+            3,
+        ),
+        "rate_limit": rate_limit,
+        "endpoints": {
+            name: {**total, "status_codes": dict(total["status_codes"])}
+            for name, total in sorted(endpoints.items())
+        },
+        "commands": commands,
+    }
+
+
+def markdown_summary(report: "Dict[str, Any]") -> str:
+    """Return the Markdown job summary of an aggregated metrics report"""
+    lines = [
+        "### push-action",
+        "",
+        f"{report['api_calls']} GitHub API requests "
+        f"({report['api_bytes'] / 2**10:.0f} KiB), "
+        f"{report['wait_seconds']:.0f} s waiting for status checks.",
+        "",
+        "| Command | Duration (s) | API requests | Phases |",
+        "| --- | ---: | ---: | --- |",
+    ]
+    for command in report["commands"]:
+        phases = ", ".join(
+            f"{name}: {phase['seconds']:.1f} s ({phase['count']}x)"
+            for name, phase in command["phases"].items()
+        )
+        lines.append(
+            f"| `{command['command']}`{'' if command['success'] else ' (failed)'} "
+            f"| {command['seconds']:.1f} | {command['api']['requests']} | {phases} |"
+        )
+
+    lines.extend(
+        [
+            "",
+            "| Endpoint | Requests | KiB | Time (s) | Status codes |",
+            "| --- | ---: | ---: | ---: | --- |",
+        ]
+    )
+    for name, request in report["endpoints"].items():
+        status_codes = ", ".join(
+            f"{code}: {count}"
+            for code, count in sorted(request["status_codes"].items())
+        )
+        lines.append(
+            f"| `{name}` | {request['requests']} | {request['bytes'] / 2**10:.1f} "
+            f"| {request['seconds']:.1f} | {status_codes} |"
+        )
+
+    rate_limit = report["rate_limit"]
+    if rate_limit["remaining"] is not None:
+        lines.extend(
+            [
+                "",
+                f"API rate limit: {rate_limit['used']} requests used, "
+                f"{rate_limit['remaining']}/{rate_limit['limit']} remaining, "
+                f"{rate_limit['rate_limited']} rate-limited responses, "
+                f"{rate_limit['throttled_seconds']:.0f} s throttled.",
+            ]
+        )
+
+    return "\n".join(lines) + "\n"
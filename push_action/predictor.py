@@ -0,0 +1,223 @@
+"""push_action.predictor
+
+Prediction of the completion times of the required status checks from the durations of
+previous runs of the same jobs (`--duration-history` and `--predict-runs`).
+
+The durations of a job are learnt from two (optional) sources:
+
+- A local duration history file, which is updated with the durations of the jobs that
+  completed successfully in every `wait_for_checks` run.
+  The file should be persisted between workflow runs, e.g., with `actions/cache`.
+- The most recent successful runs of the same workflows, retrieved from the GitHub API.
+
+A job is then expected to take the median of its known durations, and to complete that
+long after it started (or from now, if it is still queued).
+The predicted completion times are used by the polling scheduler (see
+`push_action.scheduler`) and for the ETA printed while waiting.
+"""
+
+import json
+import logging
+from statistics import median
+from threading import Lock
+from time import time
+from typing import TYPE_CHECKING
+
+from push_action.config import CONFIG, DEFAULT_CONCURRENCY
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Dict, List, Optional
+    from collections.abc import Iterable
+
+    from push_action.jobs import Job
+
+
+LOGGER = logging.getLogger("push_action.predictor")
+
+
+HISTORY_VERSION = 1
+HISTORY_SIZE = 20
+"""Number of durations kept per job in the duration history file."""
+
+
+class DurationPredictor:
+    """Predict the completion of jobs from their durations in previous runs
+
+    Durations are kept per job (status) name, at most `history_size` per job, with the
+    most recent last.
+    """
+
+    def __init__(self, history_size: int = HISTORY_SIZE) -> None:
+        self.history_size = history_size
+        self.durations: "Dict[str, List[float]]" = {}
+        self._lock = Lock()
+
+    def __bool__(self) -> bool:
+        """Whether any durations are known"""
+        return bool(self.durations)
+
+    def add(self, name: str, duration: float) -> None:
+        """Add a duration of a job"""
+        with self._lock:
+            durations = self.durations.setdefault(name, [])
+            durations.append(round(duration, 1))
+            del durations[: -self.history_size]
+
+    def add_jobs(self, jobs: "Iterable[Job]") -> int:
+        """Add the durations of the successfully completed jobs
+
+        Returns the number of added durations.
+        """
+        added = 0
+        for job in jobs:
+            if (
+                job.completed
+                and job.conclusion == "success"
+                and job.started_at is not None
+                and job.completed_at is not None
+                and job.completed_at >= job.started_at
+            ):
+                self.add(job.name, job.completed_at - job.started_at)
+                added += 1
+        return added
+
+    def expected_duration(self, name: str) -> "Optional[float]":
+        """Return the expected duration of a job, or `None` if it is unknown"""
+        durations = self.durations.get(name)
+        return median(durations) if durations else None
+
+    def remaining(self, job: "Job", now: "Optional[float]" = None) -> "Optional[float]":
+        """Predict the number of seconds until a job completes
+
+        A queued job is expected to take at least its expected duration from `now`.
+        The prediction is negative for jobs that are taking longer than expected, and
+        `None` if the duration of the job is unknown.
+        """
+        if job.completed:
+            return 0.0
+
+        expected = self.expected_duration(job.name)
+        if expected is None:
+            return None
+
+        now = now if now is not None else time()
+        started_at = job.started_at if job.started_at is not None else now
+        return started_at + expected - now
+
+    def load(self, path: str) -> None:
+        """Load the durations from a duration history file, if it exists"""
+        try:
+            with open(path, encoding="utf8") as handle:
+                history = json.load(handle)
+        except FileNotFoundError:
+            LOGGER.debug("No duration history at %s", path)
+            return
+        except (OSError, ValueError) as exc:
+            print(f"Could not read the duration history {path}: {exc}", flush=True)
+            return
+
+        if history.get("version") != HISTORY_VERSION:
+            print(
+                f"Ignoring the duration history {path} with unsupported version "
+                f"{history.get('version')!r} (supported: {HISTORY_VERSION}).",
+                flush=True,
+            )
+            return
+
+        for name, durations in history.get("jobs", {}).items():
+            for duration in durations:
+                if isinstance(duration, (int, float)) and duration >= 0:
+                    self.add(name, duration)
+
+    def save(self, path: str) -> None:
+        """Write the durations to a duration history file"""
+        with self._lock:
+            history = {
+                "version": HISTORY_VERSION,
+                "jobs": dict(sorted(self.durations.items())),
+            }
+        try:
+            with open(path, "w", encoding="utf8") as handle:
+                json.dump(history, handle, separators=(",", ":"))
+        except OSError as exc:
+            print(f"Could not write the duration history {path}: {exc}", flush=True)
+
+
+PREDICTOR = DurationPredictor()
+
+
+def learn_durations(
+    jobs: "List[Job]",
+    history: str = "",
+    recent_runs: int = 0,
+    max_workers: int = DEFAULT_CONCURRENCY,
+) -> None:
+    """Learn the durations of the required jobs from previous runs
+
+    The durations are read from the duration history file `history` (if any), and
+    retrieved from the `recent_runs` most recent successful runs of the workflows of
+    the jobs.
+    """
+    from push_action.utils import (  # pylint: disable=import-outside-toplevel
+        COMMIT_CHECKS,
+        get_branch_head_sha,
+        get_head_sha_workflow_runs,
+        get_recent_workflow_runs,
+        get_workflow_runs_jobs,
+    )
+
+    if history:
+        PREDICTOR.load(history)
+
+    if recent_runs > 0:
+        run_ids = {job.run_id for job in jobs if job.run_id != COMMIT_CHECKS}
+        workflow_ids = sorted(
+            {
+                run["workflow_id"]
+                for run in get_head_sha_workflow_runs(
+                    get_branch_head_sha(CONFIG.args.temp_branch),
+                    CONFIG.args.temp_branch,
+                )
+                if run["id"] in run_ids
+            }
+        )
+        names = {job.name for job in jobs}
+        for run_jobs in get_workflow_runs_jobs(
+            [
+                run_id
+                for workflow_id in workflow_ids
+                for run_id in get_recent_workflow_runs(workflow_id, recent_runs)
+            ],
+            max_workers=max_workers,
+        ).values():
+            PREDICTOR.add_jobs(job for job in run_jobs if job.name in names)
+
+    known = sum(1 for job in jobs if PREDICTOR.expected_duration(job.name) is not None)
+    if known:
+        print(
+            f"Predicting the completion of {known} of {len(jobs)} required checks "
+            "from their durations in previous runs.",
+            flush=True,
+        )
+    else:
+        print(
+            "The durations of the required checks in previous runs are not known, "
+            "their completion will not be predicted.",
+            flush=True,
+        )
+
+
+def update_history(path: str, jobs: "Iterable[Job]") -> None:
+    """Add the durations of the successfully completed jobs to a duration history file
+
+    Only the durations from the file itself are kept, i.e., not the durations learnt
+    from recent workflow runs, so these are not added again on every run.
+    """
+    history = DurationPredictor()
+    history.load(path)
+    added = history.add_jobs(jobs)
+    if added:
+        history.save(path)
+        print(
+            f"Added {added} job durations to the duration history {path}.", flush=True
+        )
@@ -0,0 +1,150 @@
+"""push_action.profiling
+
+Profiling of `push-action` commands (`--profile`).
+
+A command is profiled in two ways:
+
+- Deterministically with `cProfile`, written as a `pstats` file (`.prof`), which can be
+  inspected with, e.g., `python -m pstats` or `snakeviz`.
+  Note, `cProfile` only profiles the thread running the command, not the worker threads
+  sending concurrent requests.
+- By sampling the stacks of all threads, written in the collapsed-stack format
+  (`.collapsed`), which can be rendered with, e.g., `flamegraph.pl` or speedscope.
+  The samples are wall-clock samples, i.e., time spent waiting (sleeping, or on the
+  network) is included.
+
+Furthermore, a report of the functions with the highest cumulative time is printed to
+stderr (stdout may be the result of the command, e.g., for `protected_branch`).
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from types import FrameType
+    from typing import Optional
+    from collections.abc import Iterator
+
+
+LOGGER = logging.getLogger("push_action.profiling")
+
+
+SAMPLE_INTERVAL = 0.005  # in seconds
+TOP_FUNCTIONS = 25
+"""Number of functions in the hot-function report."""
+
+
+class StackSampler:
+    """Sample the stacks of all threads in a background thread
+
+    The samples are counted per collapsed stack, i.e., the frames of a stack from the
+    outermost to the innermost frame, separated by `;`, prefixed with the thread name.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL) -> None:
+        self.interval = interval
+        self.stacks: "Counter[str]" = Counter()
+        self._stop = threading.Event()
+        self._thread: "Optional[threading.Thread]" = None
+
+    def start(self) -> None:
+        """Start sampling"""
+        self._thread = threading.Thread(
+            target=self._run, name="push-action-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        """Take samples until stopped"""
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            # pylint: disable=protected-access
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self.stacks[
+                        _collapse(names.get(thread_id, str(thread_id)), frame)
+                    ] += 1
+
+    def write(self, path: str) -> None:
+        """Write the samples in the collapsed-stack format"""
+        with open(path, "w", encoding="utf8") as handle:
+            for stack, count in sorted(self.stacks.items()):
+                handle.write(f"{stack} {count}\n")
+
+
+def _collapse(thread_name: str, frame: "Optional[FrameType]") -> str:
+    """Return the collapsed stack of a frame"""
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+            f"{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    # Spaces are not allowed in the thread name, since the count is separated by one
+    return ";".join([thread_name.replace(" ", "_"), *reversed(frames)])
+
+
+@contextmanager
+def profile(name: str, directory: str, top: int = TOP_FUNCTIONS) -> "Iterator[None]":
+    """Profile the code run within the context
+
+    The profiles are written to `push-action-profile-{name}.prof` and
+    `push-action-profile-{name}.collapsed` in `directory`.
+    Failures to write them are reported, but not raised.
+    """
+    basename = os.path.join(directory, f"push-action-profile-{name}")
+    sampler = StackSampler()
+    profiler = cProfile.Profile()
+
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+
+        try:
+            profiler.dump_stats(f"{basename}.prof")
+            sampler.write(f"{basename}.collapsed")
+        except OSError as exc:
+            written = False
+            print(
+                f"Could not write the profiles {basename}.*: {exc}",
+                file=sys.stderr,
+                flush=True,
+            )
+        else:
+            written = True
+
+        print(
+            f"\nProfile of {name} (top {top} functions by cumulative time):",
+            file=sys.stderr,
+            flush=True,
+        )
+        stats = pstats.Stats(profiler, stream=sys.stderr)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+        if written:
+            print(
+                f"Wrote profiles to {basename}.prof (cProfile) and "
+                f"{basename}.collapsed ({sum(sampler.stacks.values())} stack "
+                "samples).",
+                file=sys.stderr,
+                flush=True,
+            )
@@ -0,0 +1,168 @@
+"""push_action.ratelimit
+
+Rate-limit-aware scheduling of GitHub API requests.
+
+The `X-RateLimit-*` headers of every response are tracked, so that requests can be
+spread out as the remaining budget drops, and rate-limited requests can be retried
+once the limit resets, instead of failing.
+"""
+
+import logging
+from threading import Lock
+from time import sleep, time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Optional
+    from collections.abc import Mapping
+
+    from requests import Response
+
+
+LOGGER = logging.getLogger("push_action.ratelimit")
+
+
+LOW_BUDGET_FRACTION = 0.2
+"""Fraction of the rate limit below which requests and polls are spread out."""
+
+MAX_SPREAD_FACTOR = 10
+"""Maximum factor a poll interval is stretched with when the budget is low."""
+
+SECONDARY_RATE_LIMIT_WAIT = 60  # in seconds
+"""Time to wait after hitting a secondary rate limit without a `Retry-After` header.
+See:
+https://docs.github.com/en/rest/using-the-rest-api/rate-limits-for-the-rest-api#exceeding-the-rate-limit
+"""
+
+
+class RateLimiter:
+    """GitHub API rate limit tracker and request scheduler"""
+
+    def __init__(self) -> None:
+        self.limit: "Optional[int]" = None
+        self.remaining: "Optional[int]" = None
+        self.reset: "Optional[float]" = None
+        self._lock = Lock()
+        self.stats = {"requests": 0, "charged": 0, "rate_limited": 0}
+        self.throttled_seconds = 0.0
+
+    def reset_stats(self) -> None:
+        """Reset the per-command statistics
+
+        The tracked rate limit itself is kept, since it is shared by all commands.
+        """
+        with self._lock:
+            self.stats = {"requests": 0, "charged": 0, "rate_limited": 0}
+            self.throttled_seconds = 0.0
+
+    def update(self, headers: "Mapping[str, str]", status_code: int = 200) -> None:
+        """Update the rate limit from response headers
+
+        `304 Not Modified` responses are not counted against the rate limit.
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+            if status_code != 304:
+                self.stats["charged"] += 1
+
+            try:
+                if "X-Ratelimit-Limit" in headers:
+                    self.limit = int(headers["X-Ratelimit-Limit"])
+                if "X-Ratelimit-Remaining" in headers:
+                    self.remaining = int(headers["X-Ratelimit-Remaining"])
+                if "X-Ratelimit-Reset" in headers:
+                    self.reset = float(headers["X-Ratelimit-Reset"])
+            except ValueError as exc:
+                LOGGER.debug("Could not parse rate limit headers: %r", exc)
+
+    @property
+    def budget_fraction(self) -> float:
+        """Fraction of the rate limit that remains (1.0 if unknown)"""
+        if self.limit is None or self.remaining is None or self.limit <= 0:
+            return 1.0
+        return max(self.remaining, 0) / self.limit
+
+    def seconds_until_reset(self) -> float:
+        """Seconds until the rate limit resets (0 if unknown)"""
+        if self.reset is None:
+            return 0.0
+        return max(self.reset - time(), 0.0)
+
+    def throttle(self, max_delay: "Optional[float]" = None) -> float:
+        """Sleep before sending a request, if the remaining budget is low
+
+        When the budget is exhausted, sleep until the limit resets.
+        Otherwise, when it is below `LOW_BUDGET_FRACTION`, the remaining requests are
+        spread evenly over the time left until the reset.
+        The sleep is capped at `max_delay` seconds (e.g., the time left until the
+        `--wait-timeout` deadline).
+
+        Returns the number of seconds slept.
+        """
+        with self._lock:
+            if self.remaining is None or self.budget_fraction >= LOW_BUDGET_FRACTION:
+                return 0.0
+
+            delay = self.seconds_until_reset()
+            if self.remaining > 0:
+                delay /= self.remaining
+            if max_delay is not None:
+                delay = min(delay, max_delay)
+
+        if delay > 0:
+            LOGGER.debug("Throttling request for %.2f s (rate limit budget low)", delay)
+            sleep(delay)
+            with self._lock:
+                self.throttled_seconds += delay
+        return delay
+
+    def retry_delay(self, response: "Response") -> "Optional[float]":
+        """Return seconds to wait before retrying a rate-limited response
+
+        Returns `None` if the response was not rate limited.
+        Both primary (remaining budget is 0) and secondary rate limits (`Retry-After`
+        header or "secondary rate limit" message) are handled.
+        """
+        if response.status_code not in (403, 429):
+            return None
+
+        delay: "Optional[float]" = None
+        if "Retry-After" in response.headers:
+            try:
+                delay = float(response.headers["Retry-After"])
+            except ValueError:
+                delay = SECONDARY_RATE_LIMIT_WAIT
+        elif response.headers.get("X-Ratelimit-Remaining") == "0":
+            # Add a second to not retry right before the reset
+            delay = self.seconds_until_reset() + 1
+        elif "secondary rate limit" in response.text.lower():
+            delay = SECONDARY_RATE_LIMIT_WAIT
+
+        if delay is not None:
+            with self._lock:
+                self.stats["rate_limited"] += 1
+        return delay
+
+    def poll_interval(self, interval: float) -> float:
+        """Stretch a poll interval as the remaining budget drops
+
+        Below `LOW_BUDGET_FRACTION` the interval grows inversely with the remaining
+        budget, up to `MAX_SPREAD_FACTOR` times the original interval.
+        """
+        fraction = self.budget_fraction
+        if fraction >= LOW_BUDGET_FRACTION:
+            return interval
+        factor = min(LOW_BUDGET_FRACTION / max(fraction, 1e-9), MAX_SPREAD_FACTOR)
+        return interval * factor
+
+    def summary(self) -> str:
+        """Human-readable summary of the rate limit budget"""
+        if self.remaining is None:
+            return "unknown"
+        return (
+            f"{self.remaining}/{self.limit} remaining, resets in "
+            f"{self.seconds_until_reset():.0f} s"
+        )
+
+
+RATE_LIMITER = RateLimiter()
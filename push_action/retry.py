@@ -0,0 +1,101 @@
+"""push_action.retry
+
+Retry policy for transient GitHub API failures.
+
+Failed requests are retried with exponential backoff and full jitter, i.e., the delay
+before retry number `n` is drawn uniformly from `[0, min(max_delay, base_delay * 2**n)]`.
+The total time spent backing off is capped by an optional deadline (the remaining
+`--wait-timeout`).
+"""
+
+import logging
+import random
+from threading import Lock
+from time import monotonic
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Dict, Optional
+    from collections.abc import Mapping
+
+
+LOGGER = logging.getLogger("push_action.retry")
+
+
+RETRYABLE_STATUS_CODES = frozenset({502, 503, 504})
+"""HTTP status codes of responses considered transient failures."""
+
+DEFAULT_MAX_RETRIES = {"get": 5, "head": 5, "graphql": 5}
+"""Default maximum number of retries per (lowercase) HTTP method.
+Methods not listed here, e.g., the mutating "delete", "patch" and "post", are not
+retried.
+Read-only GraphQL queries are sent as POST requests, but retried as "graphql".
+"""
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, configurable per HTTP method"""
+
+    def __init__(
+        self,
+        max_retries: "Optional[Mapping[str, int]]" = None,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+    ) -> None:
+        self.max_retries: "Dict[str, int]" = dict(
+            DEFAULT_MAX_RETRIES if max_retries is None else max_retries
+        )
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline: "Optional[float]" = None
+        self._lock = Lock()
+        self.stats = {"retries": 0}
+        self.backoff_seconds = 0.0
+
+    def reset(self, max_retries: "Optional[Mapping[str, int]]" = None) -> None:
+        """Reset the per-command state
+
+        The deadline is unset, the maximum numbers of retries are set to the
+        defaults, updated with `max_retries`, and the statistics are reset.
+        """
+        self.deadline = None
+        self.max_retries = {**DEFAULT_MAX_RETRIES, **(max_retries or {})}
+        with self._lock:
+            self.stats = {"retries": 0}
+            self.backoff_seconds = 0.0
+
+    def set_deadline(self, seconds: "Optional[float]") -> None:
+        """Set the deadline `seconds` from now (on a monotonic clock), `None` unsets"""
+        self.deadline = None if seconds is None else monotonic() + seconds
+
+    def remaining(self) -> "Optional[float]":
+        """Seconds left until the deadline (at least 0), or `None` if there is none"""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - monotonic(), 0.0)
+
+    def next_delay(self, method: str, retries: int) -> "Optional[float]":
+        """Return the delay before the next retry, or `None` if it should not retry
+
+        `retries` is the number of retries already performed for the request.
+        """
+        if retries >= self.max_retries.get(method.lower(), 0):
+            return None
+
+        delay = random.uniform(  # nosec B311 - not used for security purposes
+            0, min(self.max_delay, self.base_delay * 2**retries)
+        )
+
+        remaining = self.remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                return None
+            delay = min(delay, remaining)
+
+        with self._lock:
+            self.stats["retries"] += 1
+            self.backoff_seconds += delay
+        return delay
+
+
+RETRY_POLICY = RetryPolicy()
@@ -9,135 +9,522 @@ The steps of progression for the whole of the action are the following:
    {input_gh_rest_api_base_url}/repos/:owner/:repo/branches/:branch
    protection -> required_status_checks -> contexts
 
-2) Get GitHub Actions runs for specific workflow:
-   {input_gh_rest_api_base_url}/repos/:owner/:repo/actions/workflows/:workflow_id/runs
-   :workflow_id can also be :workflow_file_name (e.g., 'main.yml')
-   Get :run_id from this
+2) Get GitHub Actions runs for the head commit of the temporary branch:
+   {input_gh_rest_api_base_url}/repos/:owner/:repo/actions/runs?head_sha=:sha
+   :sha is retrieved from {input_gh_rest_api_base_url}/repos/:owner/:repo/branches/:branch
+   Get :run_id from this (following all pages)
 
 3) Get names and statuses of jobs in specific run:
    {input_gh_rest_api_base_url}/repos/:owner/:repo/actions/runs/:run_id/jobs
    Match found required GitHub Actions runs found in 1)
 
-4) Wait and do 3) again until required GitHub Actions jobs have "status": "completed"
+4) Get third-party check runs and commit statuses for the head commit:
+   {input_gh_rest_api_base_url}/repos/:owner/:repo/commits/:sha/check-runs
+   {input_gh_rest_api_base_url}/repos/:owner/:repo/commits/:sha/status
+   Match required statuses found in 1) not created by GitHub Actions
+
+   Do 2) through 4) again with a short backoff until a run or check has been found for
+   every required status, or `--ready-timeout` seconds have passed
+
+5) Wait and do 3) and 4) again until required checks have "status": "completed"
    If "conclusion" in inputs provided through `--acceptable-conclusion`
    (default: "success") YAY
    Otherwise, FAIL this action
 
 """
 
+# pylint: disable=import-outside-toplevel,too-many-lines
 import argparse
+from contextlib import contextmanager
 import json
 import logging
 import os
 import sys
-from time import sleep, time
+from time import monotonic, sleep
 from typing import TYPE_CHECKING
 from urllib.parse import urlsplit
 
-from push_action.cache import IN_MEMORY_CACHE
-from push_action.utils import (
-    api_request,
-    get_branch_statuses,
-    get_required_actions,
-    get_required_checks,
-    get_workflow_run_jobs,
-    remove_branch,
+# Only light-weight modules are imported here, since this module is imported on every
+# CLI start. The subcommands import the modules they need (e.g., `requests`) on use.
+from push_action.config import (
+    CONFIG,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_PER_PAGE,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_READY_TIMEOUT,
+)
+from push_action.metrics import (
+    METRICS,
+    METRICS_FILE_ENV,
+    aggregate,
+    markdown_summary,
+    read_metrics,
+)
+from push_action.server import SOCKET_ENV, run_client, serve, socket_path
+from push_action.trace import TRACE
+from push_action.validate import (
+    parse_max_retries,
+    validate_conclusions,
+    validate_per_page,
 )
-from push_action.validate import validate_conclusions
 
 if TYPE_CHECKING:  # pragma: no cover
-    from typing import Any, Dict
+    from typing import Any, Dict, List, Optional, Set, Tuple
+
+    from collections.abc import Iterable, Iterator
+
+    from push_action.events import EventSource
+    from push_action.jobs import Job, StatusTracker
 
 
 LOGGER = logging.getLogger("push_action.run")
 
 
+READY_MIN_INTERVAL = 1  # in seconds
+READY_MAX_INTERVAL = 10  # in seconds
+
+PROTECTION_RULES_FILE = "tmp_protection_rules.json"
+"""File for passing on the pull request review protection settings between the
+`unprotect_reviews` and `protect_reviews` commands, when not using a server."""
+
+
 def wait() -> None:
-    """Wait until status checks have finished"""
-    required_statuses = get_branch_statuses(IN_MEMORY_CACHE["args"].ref)
-    actions_required = get_required_actions(required_statuses)
-    _ = get_required_checks(
-        required_statuses
-    )  # TODO: Currently not implemented  # pylint: disable=fixme
+    """Wait until status checks have finished
 
-    print(
-        f"""
+    Statuses are polled, or consumed from webhook events with `--wait-mode=webhook`.
+    """
+    from push_action.events import WebhookListener
+    from push_action.jobs import StatusTracker
+    from push_action.ratelimit import RATE_LIMITER
+    from push_action.retry import RETRY_POLICY
+    from push_action.utils import get_api_backend
+
+    charged_requests = RATE_LIMITER.stats["charged"]
+    deadline = monotonic() + 60 * CONFIG.args.wait_timeout
+
+    # Do not back off from failed requests beyond the timeout
+    RETRY_POLICY.set_deadline(60 * CONFIG.args.wait_timeout)
+
+    # Start listening before the discovery, so no events are missed
+    event_source: "Optional[EventSource]" = None
+    if CONFIG.args.wait_mode == "webhook":
+        event_source = WebhookListener(
+            secret=os.getenv("INPUT_WEBHOOK_SECRET", ""),
+            port=CONFIG.args.webhook_port,
+        )
+
+    if CONFIG.args.record_trace:
+        TRACE.start(
+            {
+                "interval": CONFIG.args.wait_interval,
+                "min_interval": CONFIG.args.min_wait_interval,
+                "max_interval": CONFIG.args.max_wait_interval,
+                "timeout": CONFIG.args.wait_timeout,
+                "ready_timeout": CONFIG.args.ready_timeout,
+                "fail_fast": CONFIG.args.fail_fast,
+                "wait_mode": CONFIG.args.wait_mode,
+                "api_backend": get_api_backend(),
+                "per_page": CONFIG.args.per_page,
+                "acceptable_conclusions": sorted(CONFIG.acceptable_conclusions),
+            }
+        )
+
+    tracker: "Optional[StatusTracker]" = None
+    try:
+        required_statuses, actions_required, checks_required = _wait_until_ready(
+            deadline
+        )
+        TRACE.required_statuses = required_statuses
+
+        print(
+            f"""
 Configuration:
-    interval: {IN_MEMORY_CACHE['args'].wait_interval!s} seconds
-    timeout: {IN_MEMORY_CACHE['args'].wait_timeout!s} minutes
+    interval: {CONFIG.args.wait_interval!s} seconds (adaptive between \
+{CONFIG.args.min_wait_interval!s} and \
+{CONFIG.args.max_wait_interval!s} seconds)
+    timeout: {CONFIG.args.wait_timeout!s} minutes
+    ready timeout: {CONFIG.args.ready_timeout!s} seconds
+    mode: {CONFIG.args.wait_mode}
+    API backend: {get_api_backend()}
+    concurrency: {CONFIG.args.concurrency!s} requests
     required status checks: {required_statuses}
         of which are:
             GitHub Action-related: {len(actions_required)}
-            Third-party checks: {len(_)}
+            Third-party checks: {len(checks_required)}
 """,
-        flush=True,
-    )
+            flush=True,
+        )
 
-    start_time = time()
-    unsuccessful_jobs = []
-    while (time() - start_time) < (60 * IN_MEMORY_CACHE["args"].wait_timeout):
-        # Iterate over all jobs, removing completed jobs from the list
-        for job in actions_required.copy():
-            if job["status"] == "completed":
-                # Job is completed
-                actions_required.remove(job)
+        if CONFIG.args.duration_history or CONFIG.args.predict_runs > 0:
+            from push_action.predictor import learn_durations
 
-                if (
-                    job.get("conclusion", "")
-                    not in IN_MEMORY_CACHE["acceptable_conclusions"]
-                ):
-                    # Job is completed unsuccessfully
-                    if IN_MEMORY_CACHE["args"].fail_fast:
-                        # Fail fast
-                        raise RuntimeError(
-                            f"Required check {job['name']} completed with conclusion "
-                            f"{job['conclusion']!r} (not part of the acceptable "
-                            "conclusions: "
-                            f"{', '.join(IN_MEMORY_CACHE['acceptable_conclusions'])})."
-                            f"\n{job}"
-                        )
-
-                    unsuccessful_jobs.append(job)
-
-        if not actions_required:
-            # All jobs are completed
-            print("All required GitHub Actions jobs complete!", flush=True)
-            break
+            with METRICS.span("prediction"):
+                learn_durations(
+                    actions_required + checks_required,
+                    history=CONFIG.args.duration_history,
+                    recent_runs=CONFIG.args.predict_runs,
+                    max_workers=CONFIG.args.concurrency,
+                )
+
+        # Third-party checks are tracked together with the GitHub Actions jobs
+        tracker = StatusTracker(required_statuses, on_update=TRACE.record)
+        _track(tracker, actions_required + checks_required)
+        if event_source is not None:
+            with METRICS.span("events"):
+                _wait_for_events(event_source, tracker, deadline)
+        _wait_for_checks(tracker, required_statuses, deadline)
+
+        unsuccessful_jobs = tracker.unsuccessful(CONFIG.acceptable_conclusions)
+        if unsuccessful_jobs:
+            raise RuntimeError(
+                "Required checks completed with a conclusion not part of the "
+                f"acceptable conclusions ({', '.join(CONFIG.acceptable_conclusions)})"
+                f":\n{unsuccessful_jobs}"
+            )
+    finally:
+        if event_source is not None:
+            event_source.close()
+        if CONFIG.args.cancel_runs and tracker is not None:
+            _cancel_failed_runs(tracker)
+        _print_request_stats(RATE_LIMITER.stats["charged"] - charged_requests)
+        if CONFIG.args.record_trace:
+            TRACE.write(CONFIG.args.record_trace, api_calls=METRICS.api_calls)
+        if CONFIG.args.duration_history and tracker is not None:
+            from push_action.predictor import update_history
+
+            update_history(CONFIG.args.duration_history, tracker.jobs)
+
+
+def _cancel_failed_runs(tracker: "StatusTracker") -> None:
+    """Cancel the remaining workflow runs for the temporary branch, if a required check
+    has completed unsuccessfully (see `push_action.cancel`)
+
+    Failures are reported, but not raised, since this is called while `wait()` is
+    already failing.
+    """
+    from push_action.cancel import cancel_runs
+
+    if tracker.unsuccessful(CONFIG.acceptable_conclusions):
+        try:
+            with METRICS.span("cancel"):
+                cancel_runs(max_workers=CONFIG.args.concurrency)
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"Could not cancel the workflow runs: {exc!r}", flush=True)
+
+
+def _wait_until_ready(deadline: float) -> "Tuple[List[str], List[Job], List[Job]]":
+    """Wait until every required status check has started for the temporary branch
+
+    The checks are discovered repeatedly with an exponential backoff, until a run or
+    check has been found for every required status, or until `--ready-timeout` seconds
+    have passed.
+    Returns the result of the last discovery (see `_discover_checks()`).
+    """
+    ready_deadline = min(monotonic() + CONFIG.args.ready_timeout, deadline)
+    interval = READY_MIN_INTERVAL
+
+    discovered = _discover_checks()
+    while True:
+        required_statuses, actions_required, checks_required = discovered
+        for job in actions_required + checks_required:
+            TRACE.record(job)
+        missing = set(required_statuses).difference(
+            job.name for job in actions_required + checks_required
+        )
+        if not missing:
+            return discovered
+
+        if monotonic() + interval > ready_deadline:
+            print(
+                f"{len(missing)} required checks were not started within "
+                f"{CONFIG.args.ready_timeout} seconds, they will not be waited for: "
+                f"{sorted(missing)}",
+                flush=True,
+            )
+            return discovered
 
-        # Some jobs have not yet completed
         print(
-            f"{len(actions_required)} required GitHub Actions jobs have not yet "
-            f"completed!\nWaiting {IN_MEMORY_CACHE['args'].wait_interval} seconds ...",
+            f"Waiting {interval:.0f} seconds for {len(missing)} required checks to "
+            "start ...",
             flush=True,
         )
-        sleep(IN_MEMORY_CACHE["args"].wait_interval)
-
-        # Update job statuses for all still running jobs
-        run_ids = {job["run_id"] for job in actions_required}
-        actions_required = []
-        for run_id in run_ids:
-            actions_required.extend(
-                [
-                    job
-                    for job in get_workflow_run_jobs(run_id, new_request=True)
-                    if job["name"] in required_statuses
-                ]
+        with METRICS.span("sleep"):
+            sleep(interval)
+        interval = min(2 * interval, READY_MAX_INTERVAL)
+
+        discovered = _discover_checks(new_request=True)
+
+
+def _discover_checks(
+    new_request: bool = False,
+) -> "Tuple[List[str], List[Job], List[Job]]":
+    """Discover the required status checks
+
+    Returns the required statuses, and the required GitHub Actions jobs and third-party
+    checks found for the temporary branch.
+    """
+    from push_action.graphql import get_required_status_checks, get_status_checks
+    from push_action.utils import (
+        COMMIT_CHECKS,
+        get_api_backend,
+        get_branch_statuses,
+        get_required_actions,
+        get_required_checks,
+    )
+
+    with METRICS.span("discovery"):
+        if get_api_backend() == "graphql":
+            # A single query returns the required statuses and all checks
+            required_statuses = get_status_checks(
+                CONFIG.args.ref, CONFIG.args.temp_branch, new_request=new_request
+            )["required_statuses"]
+            checks_required = get_required_status_checks(required_statuses)
+            actions_required = [
+                job for job in checks_required if job.run_id != COMMIT_CHECKS
+            ]
+            checks_required = [
+                job for job in checks_required if job.run_id == COMMIT_CHECKS
+            ]
+        else:
+            required_statuses = get_branch_statuses(CONFIG.args.ref)
+            actions_required = get_required_actions(
+                required_statuses,
+                CONFIG.args.temp_branch,
+                new_request=new_request,
+                max_workers=CONFIG.args.concurrency,
             )
+            checks_required = get_required_checks(
+                required_statuses, new_request=new_request
+            )
+
+    return required_statuses, actions_required, checks_required
+
+
+def _track(tracker: "StatusTracker", jobs: "Iterable[Job]") -> None:
+    """Update the tracked statuses from (polled) jobs, checking the conclusion of
+    every job that has just completed"""
+    for job in jobs:
+        completed_job = tracker.update(job)
+        if completed_job is not None:
+            _check_conclusion(completed_job)
 
-    if unsuccessful_jobs:
+
+def _check_conclusion(job: "Job") -> None:
+    """Check the conclusion of a completed job
+
+    An unsuccessful job raises immediately if failing fast, otherwise all unsuccessful
+    jobs are reported once all required checks have completed.
+    """
+    if job.conclusion not in CONFIG.acceptable_conclusions and CONFIG.args.fail_fast:
         raise RuntimeError(
-            "Required checks completed with a conclusion not part of the acceptable "
-            f"conclusions ({', '.join(IN_MEMORY_CACHE['acceptable_conclusions'])}):\n"
-            f"{unsuccessful_jobs}"
+            f"Required check {job.name} completed with conclusion "
+            f"{job.conclusion!r} (not part of the acceptable conclusions: "
+            f"{', '.join(CONFIG.acceptable_conclusions)}).\n{job}"
+        )
+
+
+def _wait_for_events(
+    event_source: "EventSource", tracker: "StatusTracker", deadline: float
+) -> None:
+    """Consume status events until the required checks have completed
+
+    If no events arrive for `--event-timeout` seconds, this returns, so the jobs that
+    have not yet completed can be polled instead.
+    """
+    from push_action.graphql import get_status_checks
+    from push_action.utils import get_api_backend, get_branch_head_sha
+
+    head_sha = (
+        get_status_checks(CONFIG.args.ref, CONFIG.args.temp_branch)["head_sha"]
+        if get_api_backend() == "graphql"
+        else get_branch_head_sha(CONFIG.args.temp_branch)
+    )
+
+    while tracker.pending and monotonic() < deadline:
+        print(f"{_progress(tracker)}\nWaiting for events ...", flush=True)
+        # Skip events for other commits and statuses that are not pending
+        wait_until = min(monotonic() + CONFIG.args.event_timeout, deadline)
+        while True:
+            event = event_source.get(timeout=wait_until - monotonic())
+            if event is None or (
+                event["name"] in tracker.pending and event["head_sha"] in ("", head_sha)
+            ):
+                break
+
+        if event is None:
+            if monotonic() < deadline:
+                print(
+                    f"No events received for {CONFIG.args.event_timeout} "
+                    "seconds. Falling back to polling ...",
+                    flush=True,
+                )
+            break
+
+        completed_job = tracker.update_event(event)
+        if completed_job is not None:
+            _check_conclusion(completed_job)
+
+
+def _wait_for_checks(
+    tracker: "StatusTracker", required_statuses: "List[str]", deadline: float
+) -> None:
+    """Poll the required checks until they have completed
+
+    Each workflow run is polled on its own schedule (see `push_action.scheduler`).
+    All third-party checks are polled together, as a single pseudo run
+    (`COMMIT_CHECKS`), since they are retrieved with the same two requests.
+    """
+    from push_action.predictor import PREDICTOR
+    from push_action.ratelimit import RATE_LIMITER
+    from push_action.scheduler import PollScheduler
+    from push_action.utils import get_api_backend
+
+    scheduler = PollScheduler(
+        default_interval=CONFIG.args.wait_interval,
+        min_interval=CONFIG.args.min_wait_interval,
+        max_interval=CONFIG.args.max_wait_interval,
+        predictor=PREDICTOR if PREDICTOR else None,
+    )
+    polled_runs = {job.run_id for job in tracker.jobs}
+    while monotonic() < deadline:
+        if not tracker.pending:
+            # All jobs are completed
+            print("All required checks complete!", flush=True)
+            break
+
+        # Some jobs have not yet completed
+        # Schedule the next poll for the runs that were just polled
+        pending_runs = tracker.pending_runs()
+        for run_id in polled_runs.intersection(pending_runs):
+            scheduler.schedule(run_id, pending_runs[run_id])
+
+        # The interval is stretched if the rate limit budget is running low
+        interval = RATE_LIMITER.poll_interval(
+            max(scheduler.next_poll(pending_runs) - monotonic(), 0.0)
+        )
+        interval = min(interval, max(deadline - monotonic(), 0.0))
+        print(f"{_progress(tracker)}\nWaiting {interval:.0f} seconds ...", flush=True)
+        with METRICS.span("sleep"):
+            sleep(interval)
+
+        # Update job statuses for the runs that are due
+        if get_api_backend() == "graphql":
+            # A single query returns the checks of all runs, so all runs are polled
+            polled_runs = set(pending_runs)
+        else:
+            polled_runs = set(scheduler.due(pending_runs))
+        with METRICS.span("poll"):
+            _poll_checks(tracker, polled_runs, required_statuses)
+
+
+def _progress(tracker: "StatusTracker") -> str:
+    """Return the progress line for the required checks that have not yet completed
+
+    The line shows the ETA of the checks, if their completion can be estimated (see
+    `push_action.scheduler`).
+    """
+    from push_action.predictor import PREDICTOR
+    from push_action.scheduler import estimate_eta, format_eta
+
+    eta = estimate_eta(
+        (job for jobs in tracker.pending_runs().values() for job in jobs),
+        predictor=PREDICTOR if PREDICTOR else None,
+    )
+    if eta is None:
+        return f"{len(tracker.pending)} required checks have not yet completed!"
+    return (
+        f"{len(tracker.pending)} required checks expected to complete "
+        f"{format_eta(eta)}!"
+    )
+
+
+def _poll_checks(
+    tracker: "StatusTracker", polled_runs: "Set[int]", required_statuses: "List[str]"
+) -> None:
+    """Update the statuses of the required checks of the runs to poll
+
+    Requests for the different runs are sent concurrently.
+    """
+    from push_action.graphql import get_required_status_checks
+    from push_action.utils import (
+        COMMIT_CHECKS,
+        get_api_backend,
+        get_required_checks,
+        get_workflow_runs_jobs,
+    )
+
+    if get_api_backend() == "graphql":
+        _track(tracker, get_required_status_checks(required_statuses, new_request=True))
+        return
+
+    for jobs in get_workflow_runs_jobs(
+        polled_runs - {COMMIT_CHECKS},
+        new_request=True,
+        max_workers=CONFIG.args.concurrency,
+    ).values():
+        _track(tracker, jobs)
+
+    if COMMIT_CHECKS in polled_runs:
+        _track(tracker, get_required_checks(required_statuses, new_request=True))
+
+
+def _print_request_stats(charged_requests: int) -> None:
+    """Print statistics about the GitHub API requests of a wait() run"""
+    from push_action.cache import MEMORY_CACHE, REVALIDATION_CACHE
+    from push_action.graphql import QUERY_STATS
+    from push_action.ratelimit import RATE_LIMITER
+    from push_action.retry import RETRY_POLICY
+    from push_action.session import connection_stats
+    from push_action.utils import get_api_backend
+
+    stats = connection_stats()
+    print(
+        f"HTTP connections: {stats['new']} new, {stats['reused']} re-used "
+        f"({stats['requests']} requests).",
+        flush=True,
+    )
+    print(
+        f"API revalidation cache: {REVALIDATION_CACHE.stats['conditional']} "
+        f"conditional requests, {REVALIDATION_CACHE.stats['not_modified']} served "
+        "from cache (304 Not Modified, not counted against the rate limit).",
+        flush=True,
+    )
+    print(
+        f"In-memory cache: {MEMORY_CACHE.stats['hits']} hits, "
+        f"{MEMORY_CACHE.stats['misses']} misses, "
+        f"{MEMORY_CACHE.stats['evictions']} evictions, "
+        f"{MEMORY_CACHE.stats['expirations']} expirations "
+        f"({len(MEMORY_CACHE)} entries).",
+        flush=True,
+    )
+    print(
+        f"API rate limit: {charged_requests} requests used while waiting, "
+        f"{RATE_LIMITER.stats['rate_limited']} rate-limited responses, "
+        f"{RATE_LIMITER.throttled_seconds:.0f} s throttled "
+        f"({RATE_LIMITER.summary()}).",
+        flush=True,
+    )
+    print(
+        f"API retries: {RETRY_POLICY.stats['retries']} transient failures retried, "
+        f"{RETRY_POLICY.backoff_seconds:.1f} s spent backing off.",
+        flush=True,
+    )
+    if get_api_backend() == "graphql":
+        print(
+            f"GraphQL API: {QUERY_STATS['queries']} queries, total cost "
+            f"{QUERY_STATS['cost']} points.",
+            flush=True,
         )
 
 
 def unprotect_reviews() -> None:
     """Remove pull request review protection for target branch"""
+    from push_action.utils import api_request, cached_api_request, invalidate_branch
+
     # Save current protection settings
     url = (
         f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/branches"
-        f"/{IN_MEMORY_CACHE['args'].ref}/protection/required_pull_request_reviews"
+        f"/{CONFIG.args.ref}/protection/required_pull_request_reviews"
     )
     response = api_request(url)
 
@@ -154,7 +541,7 @@ def unprotect_reviews() -> None:
         ),
     }
 
-    repository_info = api_request(f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}")
+    repository_info = cached_api_request(f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}")
 
     if not isinstance(repository_info, dict):
         raise TypeError(
@@ -175,25 +562,35 @@ def unprotect_reviews() -> None:
             ],
         }
 
-    with open("tmp_protection_rules.json", "w", encoding="utf8") as handle:
+    # Pass on the protection settings to `protect_reviews` in a file, also when
+    # serving (see `push_action.server`), in case the server does not survive until
+    # then. The in-memory copy only saves reading the file.
+    with open(PROTECTION_RULES_FILE, "w", encoding="utf8") as handle:
         json.dump(data, handle)
+    CONFIG.protection_rules = data
 
     # Remove protection
     api_request(
         url, http_request="delete", expected_status_code=204, check_response=False
     )
+    invalidate_branch(CONFIG.args.ref)
 
 
 def protect_reviews() -> None:
     """Re-add pull request review protection for target branch"""
+    from push_action.utils import api_request, invalidate_branch
+
     # Retrieve data
-    with open("tmp_protection_rules.json", encoding="utf8") as handle:
-        data = json.load(handle)
+    if CONFIG.protection_rules is not None:
+        data = CONFIG.protection_rules
+    else:
+        with open(PROTECTION_RULES_FILE, encoding="utf8") as handle:
+            data = json.load(handle)
 
     # Add protection
     url = (
         f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/branches"
-        f"/{IN_MEMORY_CACHE['args'].ref}/protection/required_pull_request_reviews"
+        f"/{CONFIG.args.ref}/protection/required_pull_request_reviews"
     )
     api_request(
         url,
@@ -202,6 +599,8 @@ def protect_reviews() -> None:
         check_response=False,
         json=data,
     )
+    invalidate_branch(CONFIG.args.ref)
+    CONFIG.protection_rules = None
 
 
 def protected_branch(branch: str) -> str:
@@ -209,8 +608,18 @@ def protected_branch(branch: str) -> str:
 
     Return a non-empty string if it is protected, otherwise return an empty string.
     """
+    from push_action.graphql import get_status_checks
+    from push_action.utils import cached_api_request, get_api_backend
+
+    if get_api_backend() == "graphql":
+        return (
+            "protected"
+            if get_status_checks(branch, CONFIG.args.temp_branch)["protected"]
+            else ""
+        )
+
     url = f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/branches/{branch}"
-    response: "Dict[str, Any]" = api_request(url)  # type: ignore[assignment]
+    response: "Dict[str, Any]" = cached_api_request(url)  # type: ignore[assignment]
 
     if "protected" not in response:
         raise RuntimeError(
@@ -221,6 +630,41 @@ def protected_branch(branch: str) -> str:
     return "protected" if response["protected"] else ""
 
 
+def report_metrics() -> None:
+    """Report the metrics of the `push-action` commands of the action run
+
+    The metrics of all commands are aggregated from the metrics file (see
+    `push_action.metrics`), and written to the job summary and the action outputs
+    `api_calls`, `wait_seconds` and `metrics` (the aggregated metrics as JSON).
+    """
+    path = os.getenv(METRICS_FILE_ENV, "")
+    commands = read_metrics(path) if path else []
+    if not commands:
+        print("No push-action metrics to report.", flush=True)
+        return
+
+    report = aggregate(commands)
+    print(
+        f"push-action metrics: {report['api_calls']} GitHub API requests "
+        f"({report['api_bytes'] / 2**10:.0f} KiB) in {len(commands)} commands, "
+        f"{report['wait_seconds']:.0f} seconds waiting for status checks.",
+        flush=True,
+    )
+    LOGGER.debug("Metrics: %s", json.dumps(report))
+
+    if os.getenv("GITHUB_STEP_SUMMARY"):
+        with open(os.environ["GITHUB_STEP_SUMMARY"], "a", encoding="utf8") as handle:
+            handle.write(markdown_summary(report))
+
+    if os.getenv("GITHUB_OUTPUT"):
+        with open(os.environ["GITHUB_OUTPUT"], "a", encoding="utf8") as handle:
+            handle.write(
+                f"api_calls={report['api_calls']}\n"
+                f"wait_seconds={report['wait_seconds']:.0f}\n"
+                f"metrics={json.dumps(report)}\n"
+            )
+
+
 def compile_origin_url() -> str:
     """Compile the git remote 'origin' URL for the repository."""
     compiled_url = ""
@@ -261,8 +705,31 @@ def compile_origin_url() -> str:
 
 
 def main() -> None:
-    """Main function to run this module"""
-    # Handle inputs
+    """Main function to run this module
+
+    If `PUSH_ACTION_SOCKET` is set, and a `push-action ... -- serve` server is running,
+    the command is run by the server instead (see `push_action.server`).
+    """
+    argv = sys.argv[1:]
+
+    if _parse_args(argv).ACTION == "serve":
+        if not socket_path():
+            sys.exit(f"{SOCKET_ENV} must be set to serve push-action commands.")
+        CONFIG.serving = True
+        serve(socket_path(), run)
+        sys.exit()
+
+    if socket_path():
+        try:
+            sys.exit(run_client(socket_path(), argv))
+        except (FileNotFoundError, ConnectionRefusedError):
+            LOGGER.debug("No push-action server at %s, running command", socket_path())
+
+    sys.exit(run(argv) or None)
+
+
+def _parse_args(argv: "List[str]") -> argparse.Namespace:
+    """Parse the command-line arguments"""
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--token",
@@ -295,11 +762,68 @@ def main() -> None:
         "--wait-interval",
         type=int,
         help=(
-            "Time interval (in seconds) between each new check in the wait_for_checks "
-            "run"
+            "Default time interval (in seconds) between each new check in the "
+            "wait_for_checks run. The interval is adapted for each workflow run "
+            "according to the progress of its jobs"
         ),
         default=30,
     )
+    parser.add_argument(
+        "--min-wait-interval",
+        type=int,
+        help=(
+            "Minimum time interval (in seconds) between each new check of a workflow "
+            "run in the wait_for_checks run"
+        ),
+        default=5,
+    )
+    parser.add_argument(
+        "--max-wait-interval",
+        type=int,
+        help=(
+            "Maximum time interval (in seconds) between each new check of a workflow "
+            "run in the wait_for_checks run"
+        ),
+        default=120,
+    )
+    parser.add_argument(
+        "--wait-mode",
+        type=str,
+        help=(
+            "How to wait for the status checks in the wait_for_checks run: 'poll' "
+            "the GitHub API, or consume 'webhook' events (workflow_job, check_run and "
+            "status) with a local listener, falling back to polling if no events "
+            "arrive. The webhook secret is read from the INPUT_WEBHOOK_SECRET "
+            "environment variable"
+        ),
+        choices=["poll", "webhook"],
+        default="poll",
+    )
+    parser.add_argument(
+        "--webhook-port",
+        type=int,
+        help="Port of the local webhook listener for --wait-mode=webhook",
+        default=8080,
+    )
+    parser.add_argument(
+        "--event-timeout",
+        type=int,
+        help=(
+            "Time (in seconds) without any webhook events, before falling back to "
+            "polling for --wait-mode=webhook"
+        ),
+        default=60,
+    )
+    parser.add_argument(
+        "--ready-timeout",
+        type=int,
+        help=(
+            "Grace period (in seconds) for all required status checks to start for "
+            "the temporary branch in the wait_for_checks run, before waiting for them "
+            "to complete"
+        ),
+        default=DEFAULT_READY_TIMEOUT,
+    )
     parser.add_argument(
         "--acceptable-conclusion",
         type=str,
@@ -317,6 +841,104 @@ def main() -> None:
             "checks fails. Only valid with the wait_for_checks action."
         ),
     )
+    parser.add_argument(
+        "--cancel-runs",
+        action="store_true",
+        help=(
+            "Cancel the workflow runs for the temporary branch that have not yet "
+            "completed, as soon as a required check has failed in the wait_for_checks "
+            "run, reporting the runner minutes saved"
+        ),
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help=(
+            "Maximum number of concurrent requests to the GitHub API when retrieving "
+            "the statuses of several workflow runs in the wait_for_checks run"
+        ),
+        default=DEFAULT_CONCURRENCY,
+    )
+    parser.add_argument(
+        "--per-page",
+        type=int,
+        help=(
+            "Number of items per page requested from paginated GitHub API endpoints "
+            "(1 to 100)"
+        ),
+        default=DEFAULT_PER_PAGE,
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=str,
+        help=(
+            "Maximum number of retries for transient GitHub API failures for an HTTP "
+            "method, given as METHOD=NUMBER, e.g., 'get=5'. Can be given multiple "
+            "times. By default only GET requests and GraphQL queries ('graphql') are "
+            "retried (5 times)."
+        ),
+        action="append",
+        default=[],
+    )
+    parser.add_argument(
+        "--http-pool-size",
+        type=int,
+        help="Maximum number of kept-alive HTTP connections to the GitHub API",
+        default=DEFAULT_POOL_SIZE,
+    )
+    parser.add_argument(
+        "--no-keep-alive",
+        action="store_true",
+        help="Do not keep HTTP connections to the GitHub API alive between requests",
+    )
+    parser.add_argument(
+        "--record-trace",
+        type=str,
+        help=(
+            "File to record the status transitions of the required checks seen in the "
+            "wait_for_checks run to. The trace can be replayed with different polling "
+            "settings with `python -m push_action.simulate`"
+        ),
+        default="",
+    )
+    parser.add_argument(
+        "--duration-history",
+        type=str,
+        help=(
+            "File with the durations of the required checks in previous runs, used to "
+            "predict their completion in the wait_for_checks run. The file is updated "
+            "with the durations of the successfully completed checks"
+        ),
+        default="",
+    )
+    parser.add_argument(
+        "--predict-runs",
+        type=int,
+        help=(
+            "Number of recent successful runs of each workflow to retrieve the job "
+            "durations from, to predict the completion of the required checks in the "
+            "wait_for_checks run. Zero disables retrieving recent runs"
+        ),
+        default=0,
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Profile the command, writing a cProfile (pstats) file and a "
+            "collapsed-stack file for flame graphs to --profile-dir, and printing "
+            "the functions with the highest cumulative time"
+        ),
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=str,
+        help=(
+            "Directory for the profiles written with --profile. Defaults to "
+            "$GITHUB_WORKSPACE, or the current working directory"
+        ),
+        default="",
+    )
     parser.add_argument(
         "ACTION",
         type=str,
@@ -328,36 +950,108 @@ def main() -> None:
             "protect_reviews",
             "protected_branch",
             "create_origin_url",
+            "report_metrics",
+            "serve",
         ],
     )
 
-    IN_MEMORY_CACHE["args"] = parser.parse_args()
+    return parser.parse_args(argv)
+
+
+def run(argv: "List[str]") -> str:
+    """Run a command from its command-line arguments
 
-    LOGGER.debug("Parsed args: %s", IN_MEMORY_CACHE["args"])
+    Returns a failure message, or an empty string on success.
+    """
+    CONFIG.args = _parse_args(argv)
+
+    LOGGER.debug("Parsed args: %s", CONFIG.args)
 
     fail = ""
     try:
-        if IN_MEMORY_CACHE["args"].ACTION == "wait_for_checks":
-            # Ensure that the acceptable conclusions are valid
-            IN_MEMORY_CACHE["acceptable_conclusions"] = validate_conclusions(
-                IN_MEMORY_CACHE["args"].acceptable_conclusion
-            )
-
-            wait()
-        elif IN_MEMORY_CACHE["args"].ACTION == "remove_temp_branch":
-            remove_branch(IN_MEMORY_CACHE["args"].temp_branch)
-        elif IN_MEMORY_CACHE["args"].ACTION == "unprotect_reviews":
-            unprotect_reviews()
-        elif IN_MEMORY_CACHE["args"].ACTION == "protect_reviews":
-            protect_reviews()
-        elif IN_MEMORY_CACHE["args"].ACTION == "protected_branch":
-            print(protected_branch(IN_MEMORY_CACHE["args"].ref), end="", flush=True)
-        elif IN_MEMORY_CACHE["args"].ACTION == "create_origin_url":
+        # These do not use the GitHub API, so skip configuring and instrumenting it
+        if CONFIG.args.ACTION == "create_origin_url":
             print(compile_origin_url(), end="", flush=True)
-        else:
-            raise RuntimeError(f"Unknown ACTIONS {IN_MEMORY_CACHE['args'].ACTION!r}")
+            return fail
+        if CONFIG.args.ACTION == "report_metrics":
+            report_metrics()
+            return fail
+
+        METRICS.reset(CONFIG.args.ACTION)
+        with _configured_api():
+            if CONFIG.args.profile:
+                from push_action.profiling import profile
+
+                with profile(
+                    CONFIG.args.ACTION,
+                    CONFIG.args.profile_dir
+                    or os.getenv("GITHUB_WORKSPACE")
+                    or os.getcwd(),
+                ):
+                    _run_action()
+            else:
+                _run_action()
 
     except Exception as exc:  # pylint: disable=broad-except
         fail = f"{exc.__class__.__name__}: {exc}"
 
-    sys.exit(fail or None)
+    if METRICS.command == CONFIG.args.ACTION:
+        METRICS.write(fail)
+
+    return fail
+
+
+def _run_action() -> None:
+    """Run a GitHub API command"""
+    if CONFIG.args.ACTION == "wait_for_checks":
+        # Ensure that the acceptable conclusions are valid
+        CONFIG.acceptable_conclusions = validate_conclusions(
+            CONFIG.args.acceptable_conclusion
+        )
+
+        wait()
+    elif CONFIG.args.ACTION == "remove_temp_branch":
+        from push_action.utils import remove_branch
+
+        remove_branch(CONFIG.args.temp_branch)
+    elif CONFIG.args.ACTION == "unprotect_reviews":
+        unprotect_reviews()
+    elif CONFIG.args.ACTION == "protect_reviews":
+        protect_reviews()
+    elif CONFIG.args.ACTION == "protected_branch":
+        print(protected_branch(CONFIG.args.ref), end="", flush=True)
+    else:
+        raise RuntimeError(f"Unknown ACTIONS {CONFIG.args.ACTION!r}")
+
+
+@contextmanager
+def _configured_api() -> "Iterator[None]":
+    """Configure the HTTP session and retry policy for the GitHub API requests of a
+    command
+
+    The per-command state of the retry policy (deadline and maximum retries) is reset
+    when the command is done, so it does not carry over to the next command run by a
+    server (see `push_action.server`).
+    The request statistics of the rate limiter are reset when the command starts, so
+    they cover only this command, also in its metrics (see `push_action.metrics`).
+    """
+    from push_action.ratelimit import RATE_LIMITER
+    from push_action.retry import RETRY_POLICY
+    from push_action.session import configure_session
+
+    # Ensure there is a kept-alive connection available for every worker
+    configure_session(
+        pool_size=max(
+            CONFIG.args.http_pool_size,
+            CONFIG.args.concurrency,
+        ),
+        keep_alive=not CONFIG.args.no_keep_alive,
+    )
+
+    validate_per_page(CONFIG.args.per_page)
+    RETRY_POLICY.reset(parse_max_retries(CONFIG.args.max_retries))
+    RATE_LIMITER.reset_stats()
+    try:
+        yield
+    finally:
+        RETRY_POLICY.reset()
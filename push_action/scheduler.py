@@ -0,0 +1,159 @@
+"""push_action.scheduler
+
+Adaptive, per-run polling scheduler for the `wait_for_checks` action.
+
+Instead of polling every workflow run with a fixed interval, the progress of the jobs
+in a run (completed steps and start time) is used to estimate how long it is until they
+complete.
+Runs that are nearly done are then polled more often, while long runs are polled less
+often, within the bounds of a minimum and maximum interval.
+
+If the durations of the jobs in previous runs are known (see `push_action.predictor`),
+runs are instead polled just before the predicted completion of their jobs.
+"""
+
+import logging
+from time import gmtime, monotonic, strftime, time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Dict, List, Optional
+    from collections.abc import Iterable
+
+    from push_action.jobs import Job
+    from push_action.predictor import DurationPredictor
+
+
+LOGGER = logging.getLogger("push_action.scheduler")
+
+
+def estimate_remaining(job: "Job", now: "Optional[float]" = None) -> "Optional[float]":
+    """Estimate the number of seconds until a job completes
+
+    The estimate extrapolates the time spent on the completed steps of the job to the
+    remaining steps.
+    Returns `None` if no estimate can be made, e.g., if the job is still queued.
+    """
+    if job.completed:
+        return 0.0
+
+    if job.started_at is None or not job.steps_total or not job.steps_completed:
+        return None
+
+    elapsed = max((now if now is not None else time()) - job.started_at, 0.0)
+    return elapsed * (job.steps_total - job.steps_completed) / job.steps_completed
+
+
+def estimate_completion(
+    job: "Job",
+    now: "Optional[float]" = None,
+    predictor: "Optional[DurationPredictor]" = None,
+) -> "Optional[float]":
+    """Estimate the number of seconds until a job completes
+
+    The completion predicted from previous runs of the job is preferred, unless the job
+    is already taking longer than predicted, in which case the progress of the job is
+    extrapolated (see `estimate_remaining()`).
+    """
+    if predictor is not None:
+        predicted = predictor.remaining(job, now)
+        if predicted is not None and predicted > 0:
+            return predicted
+    return estimate_remaining(job, now)
+
+
+def estimate_eta(
+    jobs: "Iterable[Job]",
+    now: "Optional[float]" = None,
+    predictor: "Optional[DurationPredictor]" = None,
+) -> "Optional[float]":
+    """Estimate the number of seconds until all jobs have completed
+
+    Returns `None` if the completion of any of the jobs cannot be estimated.
+    """
+    eta = 0.0
+    for job in jobs:
+        estimate = estimate_completion(job, now, predictor)
+        if estimate is None:
+            return None
+        eta = max(eta, estimate)
+    return eta
+
+
+def format_eta(eta: float) -> str:
+    """Format an ETA in seconds from now, e.g., `in ~3m 20s (at 12:34:56 UTC)`"""
+    seconds = round(eta)
+    if seconds >= 3600:
+        duration = f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    elif seconds >= 60:
+        duration = f"{seconds // 60}m {seconds % 60:02d}s"
+    else:
+        duration = f"{seconds}s"
+    return f"in ~{duration} (at {strftime('%H:%M:%S', gmtime(time() + eta))} UTC)"
+
+
+class PollScheduler:
+    """Schedule the next poll for each workflow run
+
+    The next poll of a run is set halfway to the estimated completion of its earliest
+    finishing job, so polls get more frequent as the run approaches completion.
+    Runs without an estimate are polled with the default interval.
+    With a `predictor`, runs with jobs of a known duration are polled just before the
+    earliest predicted completion instead, i.e., `min_interval` seconds before it.
+    All intervals are clamped to `[min_interval, max_interval]`, and times are measured
+    on a monotonic clock.
+    """
+
+    def __init__(
+        self,
+        default_interval: float,
+        min_interval: float,
+        max_interval: float,
+        predictor: "Optional[DurationPredictor]" = None,
+    ) -> None:
+        self.default_interval = default_interval
+        self.min_interval = min(min_interval, default_interval)
+        self.max_interval = max(max_interval, default_interval)
+        self.predictor = predictor
+        self._next_poll: "Dict[int, float]" = {}
+
+    def interval(self, jobs: "Iterable[Job]", now: "Optional[float]" = None) -> float:
+        """Return the poll interval for a run with the given (uncompleted) jobs
+
+        `now` is the (POSIX) time the job progress is estimated at, defaulting to the
+        current time (see `estimate_remaining()`).
+        """
+        intervals = []
+        for job in jobs:
+            predicted = (
+                self.predictor.remaining(job, now)
+                if self.predictor is not None
+                else None
+            )
+            if predicted is not None and predicted > 0:
+                intervals.append(predicted - self.min_interval)
+                continue
+            estimate = estimate_remaining(job, now)
+            if estimate is not None:
+                intervals.append(estimate / 2)
+        interval = min(intervals) if intervals else self.default_interval
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def schedule(self, run_id: int, jobs: "Iterable[Job]") -> float:
+        """Schedule the next poll of a run, returning the interval"""
+        interval = self.interval(jobs)
+        self._next_poll[run_id] = monotonic() + interval
+        LOGGER.debug("Next poll of run %s in %.1f s", run_id, interval)
+        return interval
+
+    def next_poll(self, run_ids: "Iterable[int]") -> float:
+        """Return the (monotonic) time of the next due poll among run_ids"""
+        return min(
+            (self._next_poll.get(run_id, 0.0) for run_id in run_ids),
+            default=monotonic(),
+        )
+
+    def due(self, run_ids: "Iterable[int]") -> "List[int]":
+        """Return the runs among run_ids that are due to be polled"""
+        now = monotonic()
+        return [run_id for run_id in run_ids if self._next_poll.get(run_id, 0.0) <= now]
@@ -0,0 +1,168 @@
+"""push_action.server
+
+Session mode for the `push-action` CLI.
+
+Instead of starting a new Python process for every `push-action` call of an action
+run, `push-action ... -- serve` starts a single long-lived process listening on a
+unix socket (given by the `PUSH_ACTION_SOCKET` environment variable).
+Subsequent `push-action` calls with `PUSH_ACTION_SOCKET` set are then thin clients,
+forwarding their command-line arguments to the server, which runs them in-process.
+This way, a single HTTP session and warm in-memory caches are used for the whole
+action run.
+
+The output of a command is streamed back to the client, as it is written.
+The protocol is newline-delimited JSON:
+
+- Request: `{"argv": [...], "cwd": "..."}`, where `cwd` is the working directory of
+  the client, in which the command is run (so relative paths resolve the same as
+  without a server).
+- Responses: Any number of `{"stdout": "..."}` and `{"stderr": "..."}` frames,
+  followed by a final `{"exit": ...}` frame, where the value is `None` on success, or
+  a failure message (or exit code).
+"""
+
+from contextlib import redirect_stderr, redirect_stdout
+import io
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any, Dict, List, Optional, Union
+    from collections.abc import Callable
+
+
+LOGGER = logging.getLogger("push_action.server")
+
+
+SOCKET_ENV = "PUSH_ACTION_SOCKET"
+"""Environment variable with the path to the unix socket of the server."""
+
+
+class _FrameWriter(io.TextIOBase):
+    """Text stream sending everything written to it as frames over a connection"""
+
+    def __init__(self, connection: socket.socket, name: str) -> None:
+        super().__init__()
+        self._connection = connection
+        self._name = name
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:  # type: ignore[override]
+        if text:
+            _send_frame(self._connection, {self._name: text})
+        return len(text)
+
+
+def _send_frame(connection: socket.socket, frame: "Dict[str, Any]") -> None:
+    """Send a newline-delimited JSON frame"""
+    connection.sendall(json.dumps(frame).encode() + b"\n")
+
+
+def socket_path() -> str:
+    """Return the path of the server's unix socket (empty if not set)"""
+    return os.getenv(SOCKET_ENV, "")
+
+
+def serve(path: str, handler: "Callable[[List[str]], Union[str, int, None]]") -> None:
+    """Serve commands on a unix socket until terminated
+
+    `handler` runs a command from its command-line arguments, returning a failure
+    message or exit code, or `None` on success.
+    Commands are handled one at a time.
+    The socket is removed when the server is terminated (`SIGTERM` or `SIGINT`).
+    """
+
+    def _terminate(signum, _):
+        raise SystemExit(f"Terminated by signal {signum}")
+
+    signal.signal(signal.SIGTERM, _terminate)
+
+    if os.path.exists(path):
+        os.unlink(path)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        # Only the current user may connect, since the token is sent over the socket
+        old_umask = os.umask(0o177)
+        try:
+            server.bind(path)
+        finally:
+            os.umask(old_umask)
+        server.listen()
+        LOGGER.debug("Serving push-action commands on %s", path)
+
+        try:
+            while True:
+                connection, _ = server.accept()
+                with connection:
+                    _handle(connection, handler)
+        except (KeyboardInterrupt, SystemExit) as exc:
+            LOGGER.debug("Stopping server: %r", exc)
+        finally:
+            os.unlink(path)
+
+
+def _handle(
+    connection: socket.socket,
+    handler: "Callable[[List[str]], Union[str, int, None]]",
+) -> None:
+    """Handle a single request"""
+    with connection.makefile("rb") as reader:
+        request = json.loads(reader.readline() or b"{}")
+
+    argv = request.get("argv", [])
+    LOGGER.debug("Handling command: %s", argv[-1:] if argv else argv)
+
+    stdout = _FrameWriter(connection, "stdout")
+    stderr = _FrameWriter(connection, "stderr")
+    server_cwd = os.getcwd()
+    result: "Union[str, int, None]"
+    try:
+        with redirect_stdout(stdout), redirect_stderr(stderr):  # type: ignore[type-var]
+            try:
+                os.chdir(request.get("cwd") or server_cwd)
+                result = handler(argv)
+            except SystemExit as exc:
+                # E.g., from argparse errors
+                result = exc.code
+            except OSError as exc:
+                # The working directory of the client does not exist (anymore)
+                result = f"{exc.__class__.__name__}: {exc}"
+        _send_frame(connection, {"exit": result})
+    except OSError as exc:
+        # The client has gone away
+        LOGGER.debug("Lost connection to client: %r", exc)
+    finally:
+        os.chdir(server_cwd)
+
+
+def run_client(path: str, argv: "List[str]") -> "Optional[Union[str, int]]":
+    """Run a command on the server, streaming its output
+
+    Returns the failure message or exit code of the command, or `None` on success.
+    Raises `FileNotFoundError` or `ConnectionRefusedError` if the server is not
+    running.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(path)
+        _send_frame(client, {"argv": argv, "cwd": os.getcwd()})
+
+        with client.makefile("rb") as reader:
+            for line in reader:
+                frame = json.loads(line)
+                if "stdout" in frame:
+                    sys.stdout.write(frame["stdout"])
+                    sys.stdout.flush()
+                elif "stderr" in frame:
+                    sys.stderr.write(frame["stderr"])
+                    sys.stderr.flush()
+                elif "exit" in frame:
+                    return frame["exit"]
+
+    raise RuntimeError("The push-action server closed the connection unexpectedly.")
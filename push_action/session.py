@@ -0,0 +1,126 @@
+"""push_action.session
+
+A shared, pooled HTTP session for all GitHub API requests.
+
+Re-using a single `requests.Session` keeps TCP+TLS connections alive between
+requests, so that repeated polling of the GitHub API does not pay for a new handshake
+every time.
+"""
+
+import logging
+from threading import Lock
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from push_action.config import DEFAULT_POOL_SIZE
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Dict, Optional
+
+
+LOGGER = logging.getLogger("push_action.session")
+
+
+_SESSION_SETTINGS = {
+    "pool_size": DEFAULT_POOL_SIZE,
+    "keep_alive": True,
+}
+_SESSION: "Optional[requests.Session]" = None
+_SESSION_LOCK = Lock()
+
+
+def configure_session(
+    pool_size: int = DEFAULT_POOL_SIZE, keep_alive: bool = True
+) -> None:
+    """Configure the shared session.
+
+    Must be called before the first request is sent to take effect, otherwise the
+    current session is closed and re-created with the new settings on next use.
+    If the settings are unchanged, the current session is kept.
+    """
+    if pool_size < 1:
+        raise ValueError(f"HTTP pool size must be a positive integer, got {pool_size}")
+
+    if _SESSION_SETTINGS == {"pool_size": pool_size, "keep_alive": keep_alive}:
+        return
+
+    _SESSION_SETTINGS["pool_size"] = pool_size
+    _SESSION_SETTINGS["keep_alive"] = keep_alive
+
+    close_session()
+
+
+def get_session(base_url: str) -> requests.Session:
+    """Return the shared session, creating it on first use.
+
+    A dedicated adapter is mounted for the host of `base_url`.
+    The session is shared between threads, hence it is not modified after creation:
+    Request headers, e.g., the token, must be passed with every request.
+    """
+    global _SESSION  # pylint: disable=global-statement
+
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = _create_session(base_url)
+        return _SESSION
+
+
+def _create_session(base_url: str) -> requests.Session:
+    """Create a session with the current settings"""
+    session = requests.Session()
+    session.headers["Connection"] = (
+        "keep-alive" if _SESSION_SETTINGS["keep_alive"] else "close"
+    )
+
+    split_base_url = urlsplit(base_url)
+    session.mount(
+        f"{split_base_url.scheme}://{split_base_url.netloc}/",
+        HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=_SESSION_SETTINGS["pool_size"],
+        ),
+    )
+
+    LOGGER.debug(
+        "Created HTTP session for %s (settings: %s)",
+        split_base_url.netloc,
+        _SESSION_SETTINGS,
+    )
+    return session
+
+
+def close_session() -> None:
+    """Close the shared session (if any), releasing all pooled connections."""
+    global _SESSION  # pylint: disable=global-statement
+
+    with _SESSION_LOCK:
+        if _SESSION is not None:
+            _SESSION.close()
+            _SESSION = None
+
+
+def connection_stats() -> "Dict[str, int]":
+    """Return the number of new and re-used connections of the shared session.
+
+    The numbers are taken from the connection pools of the mounted adapters, where
+    every request that did not require a new connection has re-used a kept-alive one.
+    """
+    stats = {"requests": 0, "new": 0, "reused": 0}
+
+    if _SESSION is None:
+        return stats
+
+    for adapter in _SESSION.adapters.values():
+        if not isinstance(adapter, HTTPAdapter):
+            continue
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools[key]
+            stats["requests"] += pool.num_requests
+            stats["new"] += pool.num_connections
+
+    stats["reused"] = max(stats["requests"] - stats["new"], 0)
+    return stats
@@ -0,0 +1,415 @@
+"""push_action.simulate
+
+Replay recorded traces of `wait_for_checks` runs (see `push_action.trace`) with
+different polling policies, offline.
+
+Usage:
+
+    python -m push_action.simulate TRACE [TRACE ...] [--policy SETTINGS ...] [--json]
+
+A policy is given as comma-separated settings, e.g.,
+`interval=30,min_interval=5,max_interval=120,ready_timeout=60,fail_fast=true`.
+Settings that are not given are taken from the recorded run.
+Without `--policy`, the recorded settings are compared with a few fixed and adaptive
+polling intervals.
+
+Every required check is replayed according to its recorded timeline: It appears when it
+was first seen, starts and completes at the times reported by GitHub, and its steps
+progress linearly in between.
+The discovery, ready backoff and per-run adaptive polling of `push_action.run` are then
+simulated on a virtual clock, reporting for every policy:
+
+- The detection latency, i.e., the time from the outcome being decided (the last
+  required check completing, or the first failure with `fail_fast`) until the wait
+  returns.
+- The number of GitHub API requests, estimated from the requests `push_action.run`
+  sends for a discovery or a poll.
+
+Checks that had not completed when the recorded run ended (e.g., with `fail_fast`) are
+never completed in a replay, and the outcome is reported as unknown for policies that
+wait for them.
+
+Rate limiting and webhook events are not simulated.
+"""
+
+import argparse
+import json
+import logging
+from math import ceil
+from statistics import mean, median
+import sys
+from typing import TYPE_CHECKING
+
+from push_action.config import DEFAULT_PER_PAGE, DEFAULT_READY_TIMEOUT
+from push_action.jobs import Job
+from push_action.run import READY_MAX_INTERVAL, READY_MIN_INTERVAL
+from push_action.scheduler import PollScheduler
+from push_action.trace import load_trace
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any, Dict, List, Optional, Set
+
+    from collections.abc import Iterable
+
+
+LOGGER = logging.getLogger("push_action.simulate")
+
+
+COMMIT_CHECKS = 0  # see `push_action.utils`, which is not imported to avoid `requests`
+
+SETTINGS: "Dict[str, Any]" = {
+    "interval": int,
+    "min_interval": int,
+    "max_interval": int,
+    "timeout": int,
+    "ready_timeout": int,
+    "fail_fast": lambda value: value.lower() in ("y", "yes", "true", "on", "1"),
+    "api_backend": str,
+    "per_page": int,
+}
+"""The settings of a policy, and how to parse them."""
+
+DEFAULT_SETTINGS: "Dict[str, Any]" = {
+    "interval": 30,
+    "min_interval": 5,
+    "max_interval": 120,
+    "timeout": 15,
+    "ready_timeout": DEFAULT_READY_TIMEOUT,
+    "fail_fast": False,
+    "api_backend": "rest",
+    "per_page": DEFAULT_PER_PAGE,
+    "acceptable_conclusions": ["skipped", "success"],
+}
+"""Settings for traces without recorded settings."""
+
+DEFAULT_POLICIES = [
+    "",
+    "interval=10,min_interval=10,max_interval=10",
+    "interval=30,min_interval=30,max_interval=30",
+    "interval=60,min_interval=60,max_interval=60",
+    "interval=30,min_interval=5,max_interval=120",
+]
+"""Policies compared without `--policy` ("" being the recorded settings)."""
+
+
+class _Check:  # pylint: disable=too-few-public-methods
+    """The recorded timeline of a required check (its latest run attempt)"""
+
+    def __init__(self, transitions: "List[Dict[str, Any]]") -> None:
+        latest = max(transition["run_attempt"] for transition in transitions)
+        transitions = [
+            transition
+            for transition in transitions
+            if transition["run_attempt"] == latest
+        ]
+
+        self.name: str = transitions[0]["name"]
+        self.run_id: int = transitions[0]["run_id"]
+        self.steps_total: int = transitions[-1]["steps_total"]
+        self.first_seen: float = transitions[0]["time"]
+
+        # The times reported by GitHub are only used if they are consistent with the
+        # times the transitions were seen, to be robust against clock skew
+        self.started: "Optional[float]" = None
+        self.completed: "Optional[float]" = None
+        last_pending = float("-inf")
+        for transition in transitions:
+            seen = transition["time"]
+            if transition["status"] not in ("in_progress", "completed"):
+                last_pending = seen
+                continue
+            if self.started is None:
+                self.started = _bounded(transition["started_at"], last_pending, seen)
+            if transition["status"] == "completed":
+                self.completed = _bounded(
+                    transition["completed_at"], max(last_pending, self.started), seen
+                )
+                break
+            last_pending = seen
+        self.conclusion: "Optional[str]" = transitions[-1]["conclusion"]
+
+    def observe(self, now: float) -> "Job":
+        """Return the job as it would be polled at `now`"""
+        if self.completed is not None and now >= self.completed:
+            return Job(
+                self.name,
+                self.run_id,
+                status="completed",
+                conclusion=self.conclusion,
+                started_at=self.started,
+                completed_at=self.completed,
+                steps_total=self.steps_total,
+                steps_completed=self.steps_total,
+            )
+
+        if self.started is not None and now >= self.started:
+            steps_completed = 0
+            if self.completed is not None and self.completed > self.started:
+                steps_completed = int(
+                    self.steps_total
+                    * (now - self.started)
+                    / (self.completed - self.started)
+                )
+            return Job(
+                self.name,
+                self.run_id,
+                status="in_progress",
+                started_at=self.started,
+                steps_total=self.steps_total,
+                steps_completed=steps_completed,
+            )
+
+        return Job(
+            self.name, self.run_id, status="queued", steps_total=self.steps_total
+        )
+
+
+def _bounded(reported: "Optional[float]", earliest: float, seen: float) -> float:
+    """Return the reported time of a transition, if it is between the earliest possible
+    time and the time it was seen, otherwise the time it was seen"""
+    if reported is None or not earliest <= reported <= seen:
+        return seen
+    return reported
+
+
+def parse_policy(spec: str, recorded: "Dict[str, Any]") -> "Dict[str, Any]":
+    """Parse a policy from comma-separated settings, defaulting to the recorded ones"""
+    policy = {**DEFAULT_SETTINGS, **recorded}
+    for setting in filter(None, spec.split(",")):
+        name, _, value = setting.partition("=")
+        name = name.strip()
+        if name not in SETTINGS:
+            raise ValueError(
+                f"Unknown policy setting {name!r}. Valid settings: {list(SETTINGS)}"
+            )
+        policy[name] = SETTINGS[name](value.strip())
+    return policy
+
+
+def _request_count(checks: "Iterable[_Check]", policy: "Dict[str, Any]") -> int:
+    """Return the number of REST API requests for polling the runs of checks"""
+    runs: "Dict[int, int]" = {}
+    for check in checks:
+        runs[check.run_id] = runs.get(check.run_id, 0) + 1
+    return sum(
+        # Check runs and commit statuses are requested together
+        2 if run_id == COMMIT_CHECKS else ceil(jobs / policy["per_page"])
+        for run_id, jobs in runs.items()
+    )
+
+
+def simulate(  # pylint: disable=too-many-branches,too-many-locals
+    trace: "Dict[str, Any]", policy: "Dict[str, Any]"
+) -> "Dict[str, Any]":
+    """Simulate waiting for the checks of a trace with a policy"""
+    transitions: "Dict[str, List[Dict[str, Any]]]" = {}
+    for transition in trace["transitions"]:
+        transitions.setdefault(transition["name"], []).append(transition)
+    checks = [_Check(check_transitions) for check_transitions in transitions.values()]
+
+    graphql = policy["api_backend"] == "graphql"
+    timeout = 60.0 * policy["timeout"]
+    now = 0.0
+    api_calls = 0
+
+    # Discover the checks, until all have started, or the ready timeout has passed
+    # The checks seen by the first discovery of the recorded run are visible right away
+    first_discovery = min((check.first_seen for check in checks), default=0.0)
+    interval = READY_MIN_INTERVAL
+    while True:
+        visible = [
+            check for check in checks if check.first_seen <= max(now, first_discovery)
+        ]
+        if graphql:
+            api_calls += 1
+        else:
+            # Branch protection (first time only), head SHA, runs, and their jobs
+            api_calls += (2 if not now else 1) + 1 + _request_count(visible, policy)
+        if len(visible) >= len(trace["required_statuses"]) or now + interval > min(
+            policy["ready_timeout"], timeout
+        ):
+            break
+        now += interval
+        interval = min(2 * interval, READY_MAX_INTERVAL)
+
+    observed = {check.name: check.observe(now) for check in visible}
+    scheduler = PollScheduler(
+        default_interval=policy["interval"],
+        min_interval=policy["min_interval"],
+        max_interval=policy["max_interval"],
+    )
+    next_poll: "Dict[int, float]" = {}
+    polled: "Set[int]" = {check.run_id for check in visible}
+    acceptable = set(policy["acceptable_conclusions"])
+    unknown = False
+
+    while True:
+        pending_runs: "Dict[int, List[Job]]" = {}
+        for job in observed.values():
+            if not job.completed:
+                pending_runs.setdefault(job.run_id, []).append(job)
+        failed = any(
+            job.completed and job.conclusion not in acceptable
+            for job in observed.values()
+        )
+        if not pending_runs or (policy["fail_fast"] and failed) or now >= timeout:
+            break
+        if now >= trace["duration"] and all(
+            check.completed is None
+            for check in visible
+            if not observed[check.name].completed
+        ):
+            # The recorded run ended before the pending checks completed
+            unknown = True
+            break
+
+        for run_id in polled.intersection(pending_runs):
+            next_poll[run_id] = now + scheduler.interval(pending_runs[run_id], now)
+        now = min(
+            max(min(next_poll.get(run_id, now) for run_id in pending_runs), now),
+            timeout,
+        )
+
+        if graphql:
+            polled = set(pending_runs)
+            api_calls += 1
+        else:
+            polled = {
+                run_id for run_id in pending_runs if next_poll.get(run_id, 0.0) <= now
+            }
+            api_calls += _request_count(
+                (check for check in visible if check.run_id in polled), policy
+            )
+        for check in visible:
+            if check.run_id in polled:
+                observed[check.name] = check.observe(now)
+
+    return {
+        "api_calls": api_calls,
+        "wait_seconds": round(now, 3),
+        "detection_latency": _detection_latency(visible, policy, now),
+        "timed_out": not unknown
+        and now >= timeout
+        and any(not job.completed for job in observed.values()),
+        "unknown_outcome": unknown,
+        "missed_checks": len(trace["required_statuses"]) - len(visible),
+    }
+
+
+def _detection_latency(
+    checks: "List[_Check]", policy: "Dict[str, Any]", returned: float
+) -> "Optional[float]":
+    """Return the time from the outcome being decided until the wait returned
+
+    Returns `None` if the outcome was not decided before the wait returned.
+    """
+    completed = {
+        check.name: (check.completed, check.conclusion)
+        for check in checks
+        if check.completed is not None
+    }
+    acceptable = set(policy["acceptable_conclusions"])
+    failures = [
+        completed_at
+        for completed_at, conclusion in completed.values()
+        if conclusion not in acceptable
+    ]
+
+    if policy["fail_fast"] and failures:
+        decided = min(failures)
+    elif checks and len(completed) == len(checks):
+        decided = max(completed_at for completed_at, _ in completed.values())
+    else:
+        return None
+
+    if decided > returned:
+        return None
+    return round(returned - decided, 3)
+
+
+def _summarize(results: "List[Dict[str, Any]]") -> "Dict[str, Any]":
+    """Summarize the results of a policy over all traces"""
+    latencies = [
+        result["detection_latency"]
+        for result in results
+        if result["detection_latency"] is not None
+    ]
+    return {
+        "traces": len(results),
+        "mean_api_calls": round(mean(result["api_calls"] for result in results), 1),
+        "mean_latency": round(mean(latencies), 1) if latencies else None,
+        "median_latency": round(median(latencies), 1) if latencies else None,
+        "max_latency": round(max(latencies), 1) if latencies else None,
+        "timeouts": sum(result["timed_out"] for result in results),
+        "unknown_outcomes": sum(result["unknown_outcome"] for result in results),
+    }
+
+
+def main(argv: "Optional[List[str]]" = None) -> None:
+    """Replay traces with polling policies, and report the results"""
+    parser = argparse.ArgumentParser(
+        prog="python -m push_action.simulate",
+        description=(
+            "Replay traces recorded with `push-action --record-trace` with different "
+            "polling policies, reporting the detection latency and number of GitHub "
+            "API requests of each policy."
+        ),
+    )
+    parser.add_argument("TRACE", nargs="+", help="Recorded trace files")
+    parser.add_argument(
+        "--policy",
+        action="append",
+        help=(
+            "Policy as comma-separated settings, e.g., 'interval=30,fail_fast=true'. "
+            f"Valid settings: {', '.join(SETTINGS)}. Settings not given are taken from "
+            "the recorded run. Can be given multiple times"
+        ),
+    )
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    traces = [load_trace(path) for path in args.TRACE]
+    policies = args.policy or DEFAULT_POLICIES
+
+    report = {}
+    try:
+        for spec in policies:
+            results = [
+                simulate(trace, parse_policy(spec, trace.get("settings") or {}))
+                for trace in traces
+            ]
+            report[spec or "recorded"] = {
+                **_summarize(results),
+                "results": results,
+            }
+    except ValueError as exc:
+        sys.exit(f"Error: {exc}")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    recorded_calls = [trace.get("api_calls", 0) for trace in traces]
+    print(
+        f"{len(traces)} traces (recorded runs: {mean(recorded_calls):.1f} API "
+        "requests on average)\n"
+    )
+    print(
+        f"{'Policy':<50} {'API calls':>9} {'Latency (mean/median/max)':>26} "
+        f"{'Timeouts':>8} {'Unknown':>7}"
+    )
+    for name, summary in report.items():
+        latency = (
+            f"{summary['mean_latency']:.1f}/{summary['median_latency']:.1f}/"
+            f"{summary['max_latency']:.1f} s"
+            if summary["mean_latency"] is not None
+            else "-"
+        )
+        print(
+            f"{name:<50} {summary['mean_api_calls']:>9.1f} {latency:>26} "
+            f"{summary['timeouts']:>8} {summary['unknown_outcomes']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
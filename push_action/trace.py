@@ -0,0 +1,154 @@
+"""push_action.trace
+
+Recording of the job status transitions seen by the `wait_for_checks` action
+(`--record-trace`).
+
+A trace is a compact JSON file, which can be replayed offline with different polling
+policies (see `push_action.simulate`).
+It contains the settings of the recorded run, the number of API requests it sent, and
+a row per transition of a required status check, i.e., whenever the run attempt, status
+or conclusion of a check changes:
+
+    [time, name, status, conclusion, run_id, run_attempt, started_at, completed_at,
+     steps_total]
+
+All times are in seconds relative to the start of the recorded `wait_for_checks` run.
+`time` is when the transition was seen, while `started_at` and `completed_at` are the
+times reported by GitHub (if any).
+"""
+
+import json
+import logging
+from threading import Lock
+from time import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover
+    from typing import Any, Dict, List, Optional, Tuple
+
+    from push_action.jobs import Job
+
+
+LOGGER = logging.getLogger("push_action.trace")
+
+
+TRACE_VERSION = 1
+TRANSITION_FIELDS = (
+    "time",
+    "name",
+    "status",
+    "conclusion",
+    "run_id",
+    "run_attempt",
+    "started_at",
+    "completed_at",
+    "steps_total",
+)
+"""The fields of a transition row in a trace."""
+
+
+class TraceRecorder:
+    """Record the status transitions of the required status checks
+
+    Recording is disabled until `start()` is called, so `record()` can be called
+    unconditionally.
+    The required statuses are set once they have been discovered.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.enabled = False
+        self.started = 0.0
+        self.settings: "Dict[str, Any]" = {}
+        self.required_statuses: "List[str]" = []
+        self.transitions: "List[List[Any]]" = []
+        self._states: "Dict[str, Tuple[int, str, Optional[str]]]" = {}
+
+    def start(self, settings: "Dict[str, Any]") -> None:
+        """Start recording a new trace, with the settings of the run"""
+        with self._lock:
+            self.enabled = True
+            self.started = time()
+            self.settings = settings
+            self.required_statuses = []
+            self.transitions = []
+            self._states = {}
+
+    def record(self, job: "Job") -> None:
+        """Record the state of a job, if it is a transition"""
+        if not self.enabled:
+            return
+
+        state = (job.run_attempt, job.status, job.conclusion)
+        with self._lock:
+            if self._states.get(job.name) == state:
+                return
+            self._states[job.name] = state
+            self.transitions.append(
+                [
+                    self._offset(time()),
+                    job.name,
+                    job.status,
+                    job.conclusion,
+                    job.run_id,
+                    job.run_attempt,
+                    self._offset(job.started_at),
+                    self._offset(job.completed_at),
+                    job.steps_total,
+                ]
+            )
+
+    def _offset(self, timestamp: "Optional[float]") -> "Optional[float]":
+        """Return a POSIX timestamp relative to the start of the trace"""
+        if timestamp is None:
+            return None
+        return round(timestamp - self.started, 3)
+
+    def write(self, path: str, api_calls: int) -> None:
+        """Write the trace, and stop recording
+
+        Failures to write the file are reported, but not raised.
+        """
+        with self._lock:
+            self.enabled = False
+            trace: "Dict[str, Any]" = {
+                "version": TRACE_VERSION,
+                "started": round(self.started, 3),
+                "duration": self._offset(time()),
+                "settings": self.settings,
+                "required_statuses": sorted(self.required_statuses),
+                "api_calls": api_calls,
+                "fields": TRANSITION_FIELDS,
+                "transitions": self.transitions,
+            }
+
+        try:
+            with open(path, "w", encoding="utf8") as handle:
+                json.dump(trace, handle, separators=(",", ":"))
+        except OSError as exc:
+            print(f"Could not write the trace {path}: {exc}", flush=True)
+            return
+        print(
+            f"Recorded {len(trace['transitions'])} status transitions to {path}.",
+            flush=True,
+        )
+
+
+TRACE = TraceRecorder()
+
+
+def load_trace(path: str) -> "Dict[str, Any]":
+    """Load a trace, with the transitions as dictionaries"""
+    with open(path, encoding="utf8") as handle:
+        trace = json.load(handle)
+
+    if trace.get("version") != TRACE_VERSION:
+        raise ValueError(
+            f"Unsupported trace version {trace.get('version')!r} in {path} (supported: "
+            f"{TRACE_VERSION})."
+        )
+
+    trace["transitions"] = [
+        dict(zip(trace["fields"], transition)) for transition in trace["transitions"]
+    ]
+    return trace
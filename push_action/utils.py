@@ -3,10 +3,14 @@
 Utility functions for use in the `push_action.run` module.
 """
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from enum import Enum
+from functools import cache
+import hashlib
 import logging
 import os
-from time import time
+from threading import Lock
+from time import monotonic, sleep, time
 from typing import TYPE_CHECKING
 from urllib.parse import urljoin
 import warnings
@@ -18,20 +22,50 @@ except ImportError:
 
 import requests
 
-from push_action.cache import IN_MEMORY_CACHE
-from push_action.validate import validate_rest_api_base_url
+from push_action.jobs import STATUS_STATE_CONCLUSIONS, Job, parse_timestamp
+from push_action.cache import (
+    CONDITIONAL_HEADERS,
+    FILE_CACHE,
+    MEMORY_CACHE,
+    REVALIDATION_CACHE,
+    memoize,
+)
+from push_action.config import CONFIG, DEFAULT_CONCURRENCY, DEFAULT_PER_PAGE
+from push_action.metrics import METRICS
+from push_action.ratelimit import RATE_LIMITER
+from push_action.retry import RETRY_POLICY, RETRYABLE_STATUS_CODES
+from push_action.session import get_session
+from push_action.validate import validate_api_backend, validate_rest_api_base_url
 
 if TYPE_CHECKING:  # pragma: no cover
-    from typing import List, Union
-    from collections.abc import Callable
+    from typing import Any, Dict, List, Optional, Tuple, Union
+    from collections.abc import Callable, Iterable, Iterator
 
 
 LOGGER = logging.getLogger("push_action.utils")
 
 
 REQUEST_TIMEOUT = 10  # in seconds
-API_V3_BASE = validate_rest_api_base_url(os.getenv("INPUT_GH_REST_API_BASE_URL", ""))
+FILE_CACHE_TTL = 10 * 60  # in seconds
+MAX_RATE_LIMIT_RETRIES = 3
 API_VERSION = "2022-11-28"
+GITHUB_ACTIONS_APP = "github-actions"  # slug of the GitHub Actions app
+COMMIT_CHECKS = 0  # pseudo run ID for third-party check runs and commit statuses
+
+
+@cache
+def get_api_v3_base() -> str:
+    """Return the GitHub REST API base URL from the `gh_rest_api_base_url` input
+
+    The input is validated on first use, instead of on import.
+    """
+    return validate_rest_api_base_url(os.getenv("INPUT_GH_REST_API_BASE_URL", ""))
+
+
+@cache
+def get_api_backend() -> str:
+    """Return the GitHub API backend from the `gh_api_backend` input"""
+    return validate_api_backend(os.getenv("INPUT_GH_API_BACKEND", ""))
 
 
 class RepoRole(Enum):
@@ -63,34 +97,72 @@ def api_request(
 ) -> "Union[requests.Response, List[dict], dict, None]":
     """Perform GitHub API v3 request
 
-    kwargs will be passed on to requests.<http_request> method.
+    kwargs will be passed on to requests.Session.<http_request> method of the shared
+    session (see `push_action.session`).
+
+    GET requests with `check_response=True` are conditional requests: If a previous
+    response for the same URL and parameters carried an `ETag` or `Last-Modified`
+    header, it is revalidated, and the cached body is returned on `304 Not Modified`.
+
+    Transient failures are retried according to the retry policy for `retry_as`
+    (default: `http_request`), e.g., `"graphql"` for read-only GraphQL queries.
     """
-    url = urljoin(API_V3_BASE, url)
-    try:
-        requests_action: "Callable[..., requests.Response]" = getattr(
-            requests, http_request
-        )
-    except AttributeError as exc:
-        raise RuntimeError(
-            f"Unknown HTTP Request: {http_request}. Not supported by requests package."
-        ) from exc
+    return _api_request(
+        url,
+        http_request=http_request,
+        expected_status_code=expected_status_code,
+        check_response=check_response,
+        **kwargs,
+    )[0]
 
-    try:
-        response = requests_action(
-            url,
-            headers={
-                "Authorization": f"Bearer {IN_MEMORY_CACHE['args'].token}",
-                "Accept": "application/vnd.github.v3+json",
-                "X-GitHub-Api-Version": API_VERSION,
-            },
-            timeout=REQUEST_TIMEOUT,
-            **kwargs,
+
+def _api_request(
+    url: str,
+    http_request: str = "get",
+    expected_status_code: int = 200,
+    check_response: bool = True,
+    transform: "Optional[Callable[[Any], Any]]" = None,
+    **kwargs,
+) -> "Tuple[Union[requests.Response, List[dict], dict, None], Dict[str, str]]":
+    """Perform GitHub API v3 request, see `api_request()`
+
+    `transform` is applied to the JSON response, before it is stored in the
+    revalidation cache.
+    Returns the response and its pagination links (`{rel: url}`).
+    """
+    url = urljoin(get_api_v3_base(), url)
+    # Headers are passed per request, since the session is shared between threads
+    kwargs["headers"] = {
+        "Authorization": f"Bearer {CONFIG.args.token}",
+        "Accept": "application/vnd.github.v3+json",
+        "X-GitHub-Api-Version": API_VERSION,
+        **kwargs.get("headers", {}),
+    }
+    revalidation_key = ""
+    if http_request == "get" and check_response:
+        revalidation_key = (
+            requests.Request("GET", url, params=kwargs.get("params")).prepare().url
+            or url
         )
-    except (
-        requests.exceptions.ConnectionError,
-        requests.exceptions.ConnectTimeout,
-    ) as exc:
-        raise RuntimeError(f"Couldn't connect to {url!r}.\n{exc!r}") from exc
+        kwargs["headers"].update(
+            REVALIDATION_CACHE.conditional_headers(revalidation_key)
+        )
+
+    requests_action = _requests_action(http_request)
+    response = _send_request(requests_action, url, http_request, **kwargs)
+
+    if revalidation_key and response.status_code == 304:
+        try:
+            return REVALIDATION_CACHE.revalidated(revalidation_key)
+        except KeyError:
+            # The cached response was evicted in the meantime, request it again
+            LOGGER.debug("API Call to: %s\nResponse: 304 Not Modified (evicted)", url)
+            kwargs["headers"] = {
+                name: value
+                for name, value in kwargs["headers"].items()
+                if name not in CONDITIONAL_HEADERS
+            }
+            response = _send_request(requests_action, url, http_request, **kwargs)
 
     if response.status_code != expected_status_code:
         try:
@@ -118,19 +190,215 @@ def api_request(
                 )
             raise RuntimeError(message)
 
+    links = {rel: link["url"] for rel, link in response.links.items() if "url" in link}
+
     if check_response:
+        raw_response = response
         try:
             response = response.json()
         except json.JSONDecodeError as exc:
             raise RuntimeError(f"Failed to jsonify response.\n{exc!r}") from exc
 
+        if transform is not None:
+            response = transform(response)
+
+        if revalidation_key:
+            REVALIDATION_CACHE.store(
+                revalidation_key, raw_response.headers, response, links
+            )
+
     LOGGER.debug(
         "API Call to: %s\nResponse: %s",
         url,
         response.text if isinstance(response, requests.Response) else response,
     )
 
-    return response
+    return response, links
+
+
+def _requests_action(http_request: str) -> "Callable[..., requests.Response]":
+    """Return the method of the shared session for `http_request`"""
+    try:
+        return getattr(get_session(get_api_v3_base()), http_request)
+    except AttributeError as exc:
+        raise RuntimeError(
+            f"Unknown HTTP Request: {http_request}. Not supported by requests package."
+        ) from exc
+
+
+def _send_request(
+    requests_action: "Callable[..., requests.Response]",
+    url: str,
+    http_request: str = "get",
+    retry_as: "Optional[str]" = None,
+    **kwargs,
+) -> requests.Response:
+    """Send a request, respecting the GitHub API rate limit and retrying on failures
+
+    Requests are throttled when the remaining budget is low, and rate-limited requests
+    are retried (up to `MAX_RATE_LIMIT_RETRIES` times) once the limit allows it.
+    Neither waits beyond the deadline of the retry policy: A rate-limited request,
+    which could only be retried after the deadline, is not retried.
+
+    Transient failures (connection errors, timeouts and 502/503/504 responses) are
+    retried according to the retry policy for `retry_as` (default: `http_request`, see
+    `push_action.retry`).
+    """
+    retry_method = retry_as or http_request
+    rate_limited = 0
+    retries = 0
+    while True:
+        RATE_LIMITER.throttle(max_delay=RETRY_POLICY.remaining())
+
+        start = monotonic()
+        try:
+            response = requests_action(
+                url,
+                timeout=REQUEST_TIMEOUT,
+                **kwargs,
+            )
+        except (
+            requests.exceptions.ConnectionError,
+            requests.exceptions.Timeout,
+        ) as exc:
+            METRICS.record_request(http_request, url, None, 0, monotonic() - start)
+            retry_delay = RETRY_POLICY.next_delay(retry_method, retries)
+            if retry_delay is None:
+                raise RuntimeError(f"Couldn't connect to {url!r}.\n{exc!r}") from exc
+            failure = repr(exc)
+        else:
+            METRICS.record_request(
+                http_request,
+                url,
+                response.status_code,
+                len(response.content),
+                monotonic() - start,
+            )
+            RATE_LIMITER.update(response.headers, response.status_code)
+
+            retry_delay = RATE_LIMITER.retry_delay(response)
+            remaining = RETRY_POLICY.remaining()
+            if (
+                retry_delay is not None
+                and rate_limited < MAX_RATE_LIMIT_RETRIES
+                and (remaining is None or retry_delay <= remaining)
+            ):
+                rate_limited += 1
+                print(
+                    f"Rate limited by GitHub for request {url!r}. Retrying in "
+                    f"{retry_delay:.0f} s (attempt {rate_limited}/"
+                    f"{MAX_RATE_LIMIT_RETRIES}) ...",
+                    flush=True,
+                )
+                sleep(retry_delay)
+                continue
+
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                return response
+
+            retry_delay = RETRY_POLICY.next_delay(retry_method, retries)
+            if retry_delay is None:
+                return response
+            failure = f"status code {response.status_code}"
+
+        retries += 1
+        print(
+            f"Request {http_request.upper()} {url!r} failed ({failure}). Retrying in "
+            f"{retry_delay:.1f} s (retry {retries}) ...",
+            flush=True,
+        )
+        sleep(retry_delay)
+
+
+def paginate(
+    url: str,
+    items_key: str,
+    per_page: "Optional[int]" = None,
+    parse: "Optional[Callable[[dict], Any]]" = None,
+    **kwargs,
+) -> "Iterator[Any]":
+    """Iterate lazily over all items of a paginated GitHub API list endpoint
+
+    The next page is only requested once all items of the current page have been
+    consumed, following the `Link: <...>; rel="next"` response header.
+    Hence, a caller may stop iterating early without retrieving the remaining pages.
+
+    `per_page` defaults to the `--per-page` option.
+    If `parse` is given, the items of every page are parsed with it as soon as the page
+    has been received, and only the parsed items are kept, also in the revalidation
+    cache.
+    kwargs will be passed on to `api_request()`.
+    Note, `params` are only used for the first page, since the "next" links already
+    contain all query parameters.
+    """
+    if per_page is None:
+        per_page = getattr(CONFIG.args, "per_page", DEFAULT_PER_PAGE)
+
+    def _parse_page(page: "Any") -> "Any":
+        """Parse the items of a page, dropping their payloads"""
+        if isinstance(page, dict) and parse is not None:
+            page[items_key] = [parse(item) for item in page.get(items_key, [])]
+        return page
+
+    params = {**kwargs.pop("params", {}), "per_page": per_page}
+    next_url: "Optional[str]" = url
+    while next_url:
+        response, links = _api_request(
+            next_url,
+            params=params,
+            transform=_parse_page if parse is not None else None,
+            **kwargs,
+        )
+
+        if not isinstance(response, dict):
+            raise TypeError(
+                f"Expected response to be a dict, instead it was of type {type(response)}"
+            )
+
+        yield from response.get(items_key, [])
+
+        next_url = links.get("next")
+        params = {}
+
+
+def cached_api_request(
+    url: str, ttl: float = FILE_CACHE_TTL
+) -> "Union[List[dict], dict]":
+    """Perform GitHub API v3 GET request, re-using the response across invocations
+
+    The JSON response is stored in the file cache (see `push_action.cache.FileCache`)
+    for `ttl` seconds, see `_file_cache_key()`.
+    """
+    cache_key = _file_cache_key(url)
+
+    response = FILE_CACHE.get(cache_key)
+    if response is None:
+        response = api_request(url)
+        FILE_CACHE.set(cache_key, response, ttl=ttl)
+
+    return response  # type: ignore[return-value]
+
+
+def _file_cache_key(url: str) -> str:
+    """Return the file cache key for a GitHub API URL
+
+    The key is scoped to the current use of the action, i.e., the run, its attempt and
+    the step (`GITHUB_ACTION`), and to the token used.
+    """
+    token_hash = hashlib.sha256(CONFIG.args.token.encode()).hexdigest()
+    return (
+        f"{os.getenv('GITHUB_RUN_ID', '')}-{os.getenv('GITHUB_RUN_ATTEMPT', '')}:"
+        f"{os.getenv('GITHUB_ACTION', '')}:{token_hash[:16]}:"
+        f"{urljoin(get_api_v3_base(), url)}"
+    )
+
+
+def invalidate_branch(name: str) -> None:
+    """Drop the cached information of a branch, e.g., after changing its protection"""
+    FILE_CACHE.delete(
+        _file_cache_key(f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/branches/{name}")
+    )
+    MEMORY_CACHE.clear("get_branch_statuses")
 
 
 def remove_branch(name: str) -> None:
@@ -146,142 +414,274 @@ def remove_branch(name: str) -> None:
     )
 
 
+def cancel_workflow_run(run_id: int) -> None:
+    """Cancel a GitHub Actions workflow run"""
+    cancel_run_url = (
+        f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/actions/runs/{run_id}/cancel"
+    )
+    api_request(
+        cancel_run_url,
+        http_request="post",
+        expected_status_code=202,
+        check_response=False,
+    )
+
+
+@memoize("get_branch_statuses", ttl=FILE_CACHE_TTL)
 def get_branch_statuses(name: str, new_request: bool = False) -> "List[str]":
     """Get required statuses for branch
 
     These may be GitHub Actions jobs and/or third-party status checks.
     """
-    cache_name = "get_branch_statuses"
+    branch_statuses_url = f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/branches/{name}"
+    response = (
+        api_request(branch_statuses_url)
+        if new_request
+        else cached_api_request(branch_statuses_url)
+    )
 
-    if cache_name not in IN_MEMORY_CACHE or new_request:
-        branch_statuses_url = (
-            f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/branches/{name}"
+    if not isinstance(response, dict):
+        raise TypeError(
+            f"Expected response to be a dict, instead it was of type {type(response)}"
         )
-        response = api_request(branch_statuses_url)
 
-        if not isinstance(response, dict):
-            raise TypeError(
-                f"Expected response to be a dict, instead it was of type {type(response)}"
-            )
+    if not response["protected"]:
+        return []
 
-        if response["protected"]:
-            IN_MEMORY_CACHE[cache_name] = (
-                response["protection"]
-                .get("required_status_checks", {})
-                .get("contexts", [])
-            )
-        else:
-            IN_MEMORY_CACHE[cache_name] = []
+    return response["protection"].get("required_status_checks", {}).get("contexts", [])
 
-    return IN_MEMORY_CACHE[cache_name]
 
+def get_recent_workflow_runs(workflow_id: int, count: int) -> "List[int]":
+    """Return the IDs of the most recent successful runs of a GitHub Actions workflow
 
-def get_workflow_runs(workflow_id: int, new_request: bool = False) -> "List[dict]":
-    """Return list of GitHub Actions workflow runs"""
-    cache_name = "get_workflow_runs"
-
-    if (
-        cache_name not in IN_MEMORY_CACHE
-        or workflow_id not in IN_MEMORY_CACHE.get(cache_name, {})
-        or new_request
-    ):
-        workflow_runs_url = (
-            f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/actions/workflows"
-            f"/{workflow_id}/runs"
+    Only a single page with at most `count` runs is requested.
+    """
+    workflow_runs_url = (
+        f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/actions/workflows"
+        f"/{workflow_id}/runs"
+    )
+    response = api_request(
+        workflow_runs_url,
+        params={
+            "status": "success",
+            "exclude_pull_requests": "true",
+            "per_page": count,
+        },
+    )
+
+    if not isinstance(response, dict):
+        raise TypeError(
+            f"Expected response to be a dict, instead it was of type {type(response)}"
         )
-        response = api_request(
-            workflow_runs_url,
-            # params={"branch": IN_MEMORY_CACHE["args"].temp_branch},
-            # It seems this is currently not working as intended.
+
+    return [run["id"] for run in response.get("workflow_runs", [])[:count]]
+
+
+@memoize("get_branch_head_sha")
+def get_branch_head_sha(
+    name: str, new_request: bool = False  # pylint: disable=unused-argument
+) -> str:
+    """Return the SHA of the commit at the head of branch"""
+    branch_url = f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/branches/{name}"
+    response = api_request(branch_url)
+
+    if not isinstance(response, dict):
+        raise TypeError(
+            f"Expected response to be a dict, instead it was of type {type(response)}"
         )
 
-        if not isinstance(response, dict):
-            raise TypeError(
-                f"Expected response to be a dict, instead it was of type {type(response)}"
-            )
+    return response["commit"]["sha"]
 
-        workflow_runs = [
-            run
-            for run in response.get("workflow_runs", [])
-            if run.get("head_branch", "") == IN_MEMORY_CACHE["args"].temp_branch
-        ]
 
-        if cache_name in IN_MEMORY_CACHE:
-            IN_MEMORY_CACHE[cache_name][workflow_id] = workflow_runs
-        else:
-            IN_MEMORY_CACHE[cache_name] = {workflow_id: workflow_runs}
+@memoize("get_head_sha_workflow_runs")
+def get_head_sha_workflow_runs(
+    head_sha: str,
+    branch: str,
+    new_request: bool = False,  # pylint: disable=unused-argument
+) -> "List[dict]":
+    """Return list of GitHub Actions workflow runs for a commit on `branch`
+
+    Instead of listing the runs of every workflow, all runs in the repository are
+    queried once, filtered by `head_sha`, following all pages of the result.
+    """
+    runs_url = f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/actions/runs"
 
-    return IN_MEMORY_CACHE[cache_name][workflow_id]
+    # Runs are keyed by ID, since new runs may shift the pages while paginating
+    workflow_runs = {
+        run["id"]: run
+        for run in paginate(runs_url, "workflow_runs", params={"head_sha": head_sha})
+        if run.get("head_branch", "") == branch
+    }
 
+    return list(workflow_runs.values())
 
-def get_workflow_run_jobs(run_id: int, new_request: bool = False) -> "List[dict]":
+
+@memoize("get_workflow_run_jobs")
+def get_workflow_run_jobs(
+    run_id: int, new_request: bool = False  # pylint: disable=unused-argument
+) -> "List[Job]":
     """Return list of GitHub Actions workflow runs"""
-    cache_name = "get_workflow_run_jobs"
-
-    if (
-        cache_name not in IN_MEMORY_CACHE
-        or run_id not in IN_MEMORY_CACHE.get(cache_name, {})
-        or new_request
-    ):
-        workflow_jobs_url = (
-            f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/actions/runs/{run_id}/jobs"
-        )
-        response = api_request(workflow_jobs_url)
+    return list(iter_workflow_run_jobs(run_id))
 
-        if not isinstance(response, dict):
-            raise TypeError(
-                f"Expected response to be a dict, instead it was of type {type(response)}"
-            )
 
-        if cache_name in IN_MEMORY_CACHE:
-            IN_MEMORY_CACHE[cache_name][run_id] = response.get("jobs", [])
-        else:
-            IN_MEMORY_CACHE[cache_name] = {run_id: response.get("jobs", [])}
+def iter_workflow_run_jobs(run_id: int) -> "Iterator[Job]":
+    """Iterate lazily over the jobs of a GitHub Actions workflow run (uncached)
 
-    return IN_MEMORY_CACHE[cache_name][run_id]
+    The jobs are parsed into `Job` records page by page, dropping the rest of the
+    payloads.
+    """
+    workflow_jobs_url = (
+        f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/actions/runs/{run_id}/jobs"
+    )
+    return paginate(workflow_jobs_url, "jobs", parse=Job.from_workflow_job)
 
 
-def get_required_actions(
-    statuses: "List[str]", new_request: bool = False
-) -> "List[dict]":
-    """Get subset of statuses that belong to GitHub Actions jobs"""
-    cache_name = "get_required_actions"
+def get_workflow_runs_jobs(
+    run_ids: "Iterable[int]",
+    new_request: bool = False,
+    max_workers: int = DEFAULT_CONCURRENCY,
+) -> "Dict[int, List[Job]]":
+    """Return lists of GitHub Actions workflow run jobs for several runs
 
-    if cache_name not in IN_MEMORY_CACHE or new_request:
-        if not statuses:
-            IN_MEMORY_CACHE[cache_name] = []
-        else:
-            workflows_url = (
-                f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/actions/workflows"
-            )
-            response = api_request(workflows_url)
+    The jobs are retrieved concurrently, with at most `max_workers` requests in
+    flight at the same time.
+    The returned dictionary keeps the order of `run_ids`.
+    """
+    run_ids = list(run_ids)
 
-            if not isinstance(response, dict):
-                raise TypeError(
-                    "Expected response to be a dict, instead it was of type "
-                    f"{type(response)}"
-                )
+    if max_workers <= 1 or len(run_ids) <= 1:
+        return {
+            run_id: get_workflow_run_jobs(run_id, new_request=new_request)
+            for run_id in run_ids
+        }
 
-            runs: "List[dict]" = []
-            for workflow in response["workflows"]:
-                runs.extend(get_workflow_runs(workflow["id"]))
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(run_ids))) as executor:
+        futures = {
+            run_id: executor.submit(get_workflow_run_jobs, run_id, new_request)
+            for run_id in run_ids
+        }
 
-            jobs: "List[dict]" = []
-            for run in runs:
-                jobs.extend(get_workflow_run_jobs(run["id"]))
+    return {run_id: future.result() for run_id, future in futures.items()}
 
-            IN_MEMORY_CACHE[cache_name] = [
-                job for job in jobs if job.get("name", "") in statuses
-            ]
 
-    return IN_MEMORY_CACHE[cache_name]
+@memoize("get_required_actions")
+def get_required_actions(
+    statuses: "List[str]",
+    temp_branch: str,
+    new_request: bool = False,
+    max_workers: int = DEFAULT_CONCURRENCY,
+) -> "List[Job]":
+    """Get subset of statuses that belong to GitHub Actions jobs
+
+    The workflow runs are found with a single query for the head SHA of `temp_branch`.
+    The jobs of the runs are then requested concurrently, with at most `max_workers`
+    requests in flight, and matched against `statuses` as they arrive.
+    Once every status has been matched, no further pages or runs are requested.
+    """
+    if not statuses:
+        return []
+
+    head_sha = get_branch_head_sha(temp_branch, new_request=new_request)
+    runs = get_head_sha_workflow_runs(head_sha, temp_branch, new_request=new_request)
+
+    required_statuses = set(statuses)
+    unmatched_statuses = set(statuses)
+    lock = Lock()
+
+    def _match_run_jobs(run_id: int) -> "List[Job]":
+        """Match the jobs of a run, until all statuses have been matched"""
+        matched_jobs = []
+        for job in iter_workflow_run_jobs(run_id):
+            with lock:
+                if job.name in required_statuses:
+                    matched_jobs.append(job)
+                    unmatched_statuses.discard(job.name)
+                if not unmatched_statuses:
+                    break
+        return matched_jobs
+
+    required_jobs: "List[Job]" = []
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        futures = [executor.submit(_match_run_jobs, run["id"]) for run in runs]
+        for future in as_completed(futures):
+            required_jobs.extend(future.result())
+
+            if not unmatched_statuses:
+                # Every status has been matched, no need to look any further
+                for pending_future in futures:
+                    pending_future.cancel()
+
+    return required_jobs
+
+
+@memoize("get_commit_checks")
+def get_commit_checks(
+    head_sha: str, new_request: bool = False  # pylint: disable=unused-argument
+) -> "List[Job]":
+    """Return the check runs and commit statuses of a commit
+
+    Every check run and status is returned as a `Job`, with the `run_id` set to
+    `COMMIT_CHECKS` and `app` set to the slug of the GitHub App that created the check
+    run (empty for commit statuses).
+    Only the latest check run per name is returned.
+
+    This requires only two (paginated) requests for all contexts: One for the check
+    runs, and one for the combined commit status.
+    """
+    commit_url = f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/commits/{head_sha}"
+    checks: "Dict[str, Job]" = {}
+
+    for check_run in paginate(f"{commit_url}/check-runs", "check_runs"):
+        name = check_run.get("name", "")
+        if name in checks and checks[name].id > check_run.get("id", 0):
+            continue
+        checks[name] = Job(
+            id=check_run.get("id", 0),
+            name=name,
+            run_id=COMMIT_CHECKS,
+            status=check_run.get("status", ""),
+            conclusion=check_run.get("conclusion"),
+            started_at=parse_timestamp(check_run.get("started_at")),
+            completed_at=parse_timestamp(check_run.get("completed_at")),
+            app=(check_run.get("app") or {}).get("slug", ""),
+        )
+
+    for status in paginate(f"{commit_url}/status", "statuses"):
+        state = status.get("state", "pending")
+        checks[status.get("context", "")] = Job(
+            id=status.get("id", 0),
+            name=status.get("context", ""),
+            run_id=COMMIT_CHECKS,
+            status="in_progress" if state == "pending" else "completed",
+            conclusion=STATUS_STATE_CONCLUSIONS.get(state),
+            started_at=parse_timestamp(status.get("created_at")),
+            completed_at=(
+                None
+                if state == "pending"
+                else parse_timestamp(status.get("updated_at"))
+            ),
+        )
+
+    return list(checks.values())
 
 
 def get_required_checks(
-    statuses: "List[str]", new_request: bool = False  # pylint: disable=unused-argument
-) -> "List[str]":
+    statuses: "List[str]", new_request: bool = False
+) -> "List[Job]":
     """Get subset of statuses that belong to third-party status checks
 
-    TODO: Currently not implemented
+    I.e., check runs not created by GitHub Actions and commit statuses for the head
+    commit of the temporary branch.
     """
-    return []
+    if not statuses:
+        return []
+
+    head_sha = get_branch_head_sha(CONFIG.args.temp_branch)
+    required_statuses = set(statuses)
+
+    return [
+        check
+        for check in get_commit_checks(head_sha, new_request=new_request)
+        if check.name in required_statuses and check.app != GITHUB_ACTIONS_APP
+    ]
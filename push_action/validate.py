@@ -29,6 +29,9 @@ See the note for more information here:
 https://docs.github.com/en/enterprise-server@3.10/rest/quickstart?apiVersion=2022-11-28&tool=curl#using-curl-commands-in-github-actions.
 """
 
+API_BACKENDS = ("rest", "graphql")
+"""Supported GitHub API backends for the `gh_api_backend` input."""
+
 
 def validate_conclusions(conclusions: list[str]) -> list[str]:
     """Validate the conclusions.
@@ -84,3 +87,48 @@ def validate_rest_api_base_url(base_url: str) -> str:
         compiled_url += GITHUB_ENTERPRISE_API_PREFIX
 
     return compiled_url
+
+
+def validate_api_backend(backend: str) -> str:
+    """Validate and parse the `gh_api_backend` input."""
+    backend = backend.strip().lower() or "rest"
+
+    if backend not in API_BACKENDS:
+        raise ValueError(
+            f"Invalid value for `gh_api_backend` input: {backend!r} (expected one of: "
+            f"{', '.join(API_BACKENDS)})."
+        )
+
+    return backend
+
+
+def parse_max_retries(max_retries: list[str]) -> dict[str, int]:
+    """Validate and parse the `--max-retries` CLI option.
+
+    Each entry must be of the form `METHOD=NUMBER`, e.g., `get=5`.
+    """
+    parsed: dict[str, int] = {}
+
+    for entry in max_retries:
+        method, _, number = entry.partition("=")
+        if not method or not number.isdigit():
+            raise ValueError(
+                f"Invalid value for `--max-retries`: {entry!r} (expected "
+                "METHOD=NUMBER, e.g., 'get=5')."
+            )
+        parsed[method.strip().lower()] = int(number)
+
+    return parsed
+
+
+def validate_per_page(per_page: int) -> int:
+    """Validate the `--per-page` CLI option.
+
+    GitHub only supports between 1 and 100 items per page.
+    """
+    if not 1 <= per_page <= 100:
+        raise ValueError(
+            f"Invalid value for `--per-page`: {per_page} (must be between 1 and 100)."
+        )
+
+    return per_page
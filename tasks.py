@@ -3,9 +3,15 @@
 Tasks here are based on the [`invoke`](https://pyinvoke.org) package.
 """
 
+from argparse import Namespace
+import gc
+import json
+import os
 from pathlib import Path
 import re
+import subprocess  # nosec B404
 import sys
+import tracemalloc
 from typing import TYPE_CHECKING
 
 try:
@@ -14,10 +20,11 @@ except ImportError:
     sys.exit("'invoke' MUST be installed to run these tasks.")
 
 if TYPE_CHECKING:
-    from typing import Optional, Tuple
+    from typing import Any, Dict, List, Optional, Tuple
 
 
 TOP_DIR = Path(__file__).parent.resolve()
+BASELINES_FILE = TOP_DIR / "benchmarks" / "baselines.json"
 
 
 def update_file(
@@ -55,3 +62,253 @@ def update_version(_, version=""):
     )
 
     print(f"Bumped version to {version} !")
+
+
+def import_times(argv: "List[str]") -> "Dict[str, int]":
+    """Run the `push-action` CLI with `-X importtime`
+
+    Returns the cumulative import time (in microseconds) of every imported module.
+    """
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(TOP_DIR),
+        "GITHUB_SERVER_URL": "https://github.com",
+        "GITHUB_REPOSITORY": "owner/repo",
+        "GITHUB_ACTOR": "actor",
+        "INPUT_TOKEN": "null",
+    }
+    env.pop("PUSH_ACTION_SOCKET", None)
+
+    result = subprocess.run(  # nosec B603
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "from push_action.run import main; main()",
+            *argv,
+        ],
+        capture_output=True,
+        check=False,
+        env=env,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Error: push-action {' '.join(argv)} failed:\n{result.stderr}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.fullmatch(
+            r"import time:\s+\d+ \|\s+(?P<cumulative>\d+) \| (?P<module>.+)", line
+        )
+        if match:
+            times[match.group("module").strip()] = int(match.group("cumulative"))
+    return times
+
+
+@task(
+    help={
+        "runs": "Number of runs per command (the fastest run is used)",
+        "update": "Record the measured import times as the new baselines",
+    }
+)
+def benchmark_startup(_, runs=5, update=False):
+    """Benchmark the CLI startup, failing if it exceeds the recorded budget
+
+    The import time of `push_action.run` (and everything it imports) is measured per
+    subcommand with `python -X importtime`.
+    Furthermore, the subcommand must not import any of the forbidden modules, e.g.,
+    `requests` for subcommands not using the GitHub API.
+    """
+    baselines = json.loads(BASELINES_FILE.read_text(encoding="utf8"))
+    startup = baselines["startup"]
+
+    failures = []
+    for name, benchmark in startup["commands"].items():
+        measurements = [import_times(benchmark["argv"]) for _ in range(int(runs))]
+        import_time = min(times["push_action.run"] for times in measurements)
+
+        forbidden = sorted(
+            set(benchmark.get("forbidden_modules", [])).intersection(measurements[0])
+        )
+
+        print(
+            f"{name}: {import_time / 1000:.1f} ms (baseline: "
+            f"{benchmark['baseline_us'] / 1000:.1f} ms, budget: "
+            f"{benchmark['budget_us'] / 1000:.1f} ms)"
+        )
+
+        if forbidden:
+            failures.append(f"{name} imports forbidden modules: {forbidden}")
+        if import_time > benchmark["budget_us"]:
+            failures.append(
+                f"{name} exceeds its startup budget: {import_time / 1000:.1f} ms > "
+                f"{benchmark['budget_us'] / 1000:.1f} ms"
+            )
+
+        if update:
+            benchmark["baseline_us"] = import_time
+
+    if update:
+        BASELINES_FILE.write_text(json.dumps(baselines, indent=2) + "\n")
+        print(f"Updated baselines in {BASELINES_FILE.relative_to(TOP_DIR)} !")
+
+    if failures:
+        sys.exit("Error: " + "\nError: ".join(failures))
+
+
+def retained_memory(run_id: int, parse: bool) -> int:
+    """Return the memory (in bytes) retained for the jobs of a workflow run
+
+    The jobs are requested from the GitHub API, as configured.
+    If `parse` is true, they are retrieved with `get_workflow_runs_jobs()`, i.e., as
+    memoized `Job` records, otherwise all pages of raw JSON payloads are retained.
+    Both include the responses kept in the revalidation cache.
+    """
+    # pylint: disable=import-outside-toplevel
+    from push_action.utils import get_workflow_runs_jobs, paginate
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        if parse:
+            jobs: "Any" = get_workflow_runs_jobs([run_id])
+        else:
+            jobs = list(
+                paginate(
+                    f"/repos/{os.getenv('GITHUB_REPOSITORY', '')}/actions/runs"
+                    f"/{run_id}/jobs",
+                    "jobs",
+                )
+            )
+        gc.collect()
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del jobs
+    return retained
+
+
+@task(
+    help={
+        "jobs": "Number of jobs in the workflow run",
+        "update": "Record the measured memory as the new baseline",
+    }
+)
+def benchmark_memory(_, jobs=5000, update=False):
+    """Benchmark the memory retained for the jobs of a large workflow run
+
+    The jobs of a workflow run with `jobs` jobs are retrieved from an in-process fake
+    GitHub REST API (see `benchmarks/fake_github.py`) as `Job` records, failing if the
+    retained memory exceeds the recorded budget.
+    The memory retained by the raw JSON payloads is shown for comparison.
+    """
+    sys.path.insert(0, str(TOP_DIR / "benchmarks"))
+    # pylint: disable=import-outside-toplevel
+    from fake_github import OWNER, REPOSITORY, FakeGitHub
+
+    from push_action.config import CONFIG
+
+    baselines = json.loads(BASELINES_FILE.read_text(encoding="utf8"))
+    benchmark = baselines["memory"]["jobs"]
+
+    # Two runs, so the payloads are not revalidated against the records, or vice versa
+    fake = FakeGitHub(workflows=2, jobs_per_run=int(jobs), job_duration=3600.0)
+    fake.start()
+    os.environ.update(
+        {
+            "GITHUB_REPOSITORY": f"{OWNER}/{REPOSITORY}",
+            "INPUT_GH_REST_API_BASE_URL": fake.url,
+        }
+    )
+    CONFIG.args = Namespace(token="benchmark", per_page=100)
+    try:
+        payloads = retained_memory(1000, parse=False)
+        records = retained_memory(1001, parse=True)
+    finally:
+        fake.stop()
+
+    # The budget is recorded for the default number of jobs
+    budget = benchmark["budget_bytes"] * int(jobs) / benchmark["jobs"]
+
+    print(
+        f"{jobs} jobs: {records / 2**20:.2f} MiB as Job records, "
+        f"{payloads / 2**20:.2f} MiB as JSON payloads (baseline: "
+        f"{benchmark['baseline_bytes'] / 2**20:.2f} MiB, budget: "
+        f"{budget / 2**20:.2f} MiB)"
+    )
+
+    if update:
+        benchmark["jobs"] = int(jobs)
+        benchmark["baseline_bytes"] = records
+        BASELINES_FILE.write_text(json.dumps(baselines, indent=2) + "\n")
+        print(f"Updated baselines in {BASELINES_FILE.relative_to(TOP_DIR)} !")
+
+    if records > budget:
+        sys.exit(
+            f"Error: Job records exceed their memory budget: "
+            f"{records / 2**20:.2f} MiB > {budget / 2**20:.2f} MiB"
+        )
+
+
+@task(
+    help={
+        "scenario": "Scenario to run (default: all scenarios)",
+        "update": "Record the measured metrics as the new baselines",
+    },
+    iterable=["scenario"],
+)
+def benchmark_api(_, scenario=None, update=False):
+    """Benchmark `push-action` end to end against a fake GitHub API server
+
+    The scenarios of `benchmarks/harness.py` are run against an in-process fake GitHub
+    REST API, failing if the number of API calls, the detection latency (from the last
+    required check completing until `wait_for_checks` returns), or the peak memory
+    exceed their recorded budgets.
+    """
+    sys.path.insert(0, str(TOP_DIR / "benchmarks"))
+    # pylint: disable=import-outside-toplevel
+    from harness import SCENARIOS, run_scenarios
+
+    baselines = json.loads(BASELINES_FILE.read_text(encoding="utf8"))
+    api = baselines.setdefault("api", {})
+
+    failures = []
+    results = run_scenarios(scenario or list(SCENARIOS))
+    for name, metrics in results.items():
+        benchmark = api.setdefault(name, {})
+        budgets = benchmark.get("budgets", {})
+        print(
+            f"{name}: {metrics['api_calls']} API calls "
+            f"({metrics['bytes_transferred'] / 2**10:.0f} KiB), detection latency "
+            f"{metrics['detection_latency_seconds']:.2f} s, peak memory "
+            f"{metrics['peak_memory_bytes'] / 2**20:.2f} MiB (budget: "
+            f"{budgets.get('api_calls', '-')} API calls, "
+            f"{budgets.get('detection_latency_seconds', '-')} s, "
+            f"{budgets.get('peak_memory_bytes', 0) / 2**20:.2f} MiB)"
+        )
+
+        for metric, budget in budgets.items():
+            if metrics[metric] > budget:
+                failures.append(
+                    f"{name} exceeds its {metric} budget: {metrics[metric]} > {budget}"
+                )
+
+        if update:
+            benchmark["baseline"] = {
+                metric: metrics[metric]
+                for metric in (
+                    "api_calls",
+                    "bytes_transferred",
+                    "detection_latency_seconds",
+                    "peak_memory_bytes",
+                )
+            }
+
+    if update:
+        BASELINES_FILE.write_text(json.dumps(baselines, indent=2) + "\n")
+        print(f"Updated baselines in {BASELINES_FILE.relative_to(TOP_DIR)} !")
+
+    if failures:
+        sys.exit("Error: " + "\nError: ".join(failures))